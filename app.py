@@ -1,25 +1,55 @@
+import json
+import os
 import time
+import queue
+import threading
+from functools import partial
+# На уровне модуля импортируем только то, что нужно для объявления классов.
+# Модули виджетов импортируются в build, а магазин (SQLite, каталог, поиск) - в фоновом потоке,
+# чтобы окно появлялось сразу, а не после загрузки всего приложения
 from kivy.app import App
-from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.label import Label
-from kivy.uix.textinput import TextInput
-from kivy.uix.button import Button
-from book import Book, Magazine
-from library import Store
-from decorators import log_scenario, check_conditions, PreConditionError, PostConditionError
+from kivy.clock import Clock
+from decorators import log_scenario, check_conditions, timed_action, PreConditionError, PostConditionError
+from logs import get_logger
+
+ui_logger = get_logger('ui')
+
+# STORE_STARTUP_PROBE=путь: приложение записывает в файл время первого кадра и готовности
+# магазина (time.time()) и закрывается. Используется в benchmarks/bench_startup.py
+STARTUP_PROBE = os.environ.get('STORE_STARTUP_PROBE')
+
 
 # Основной класс приложения
 class BookStoreApp(App):
     def build(self):
-        # Инициализируем магазин
-        self.store = Store()
+        from kivy.uix.boxlayout import BoxLayout
+        from kivy.uix.label import Label
+        from kivy.uix.textinput import TextInput
+        from kivy.uix.button import Button
+        from widgets import PagedListView
+
+        # Магазин создается в фоне (см. load_store); до его готовности элементы,
+        # которым он нужен, отключены, а в строке состояния показывается загрузка
+        self.store = None
+        self.order_writer = None
+        self.startup_times = {'build': time.time()}
 
         # Создаем основной layout
         self.layout = BoxLayout(orientation='vertical')
 
-        # Создаем элементы интерфейса для отображения списков
-        self.book_list = Label(size_hint_y=None, height=200)
-        self.cart_list = Label(size_hint_y=None, height=200)
+        # Создаем элементы интерфейса для отображения списков.
+        # Списки виртуализированы: рисуются только видимые строки, данные догружаются страницами,
+        # а заголовки и сообщения выводятся в отдельные строки состояния
+        self.book_status = Label(size_hint_y=None, height=30)
+        self.book_list = PagedListView(size_hint_y=None, height=200)
+        self.cart_status = Label(size_hint_y=None, height=30)
+        self.cart_list = PagedListView(size_hint_y=None, height=200)
+
+        # Поле поиска по названию и автору. Запрос выполняется не на каждое нажатие клавиши,
+        # а после паузы в наборе (debounce): каждое изменение текста откладывает поиск заново
+        self.search_input = TextInput(hint_text='Поиск по названию или автору', multiline=False)
+        self._search_trigger = Clock.create_trigger(self.run_search, 0.25)
+        self.search_input.bind(text=self.on_search_text)
 
         # Добавляем кнопки для категорий
         self.show_books_button = Button(text='Показать книги')
@@ -36,7 +66,7 @@ class BookStoreApp(App):
         self.add_to_cart_button.bind(on_press=self.add_to_cart_wrapper)
 
         # Поле ввода и кнопка для удаления из корзины
-        self.remove_from_cart_input = TextInput(hint_text='Номер товара для удаления из корзины')
+        self.remove_from_cart_input = TextInput(hint_text='Артикул товара для удаления из корзины')
         self.remove_from_cart_button = Button(text='Удалить из корзины')
         self.remove_from_cart_button.bind(on_press=self.remove_from_cart_wrapper)
 
@@ -49,9 +79,11 @@ class BookStoreApp(App):
         self.save_order_button.bind(on_press=self.save_order_wrapper)
 
         # Добавляем все элементы в layout
+        self.layout.add_widget(self.search_input)
         self.layout.add_widget(self.show_books_button)
         self.layout.add_widget(self.show_magazines_button)
         self.layout.add_widget(self.show_newspapers_button)
+        self.layout.add_widget(self.book_status)
         self.layout.add_widget(self.book_list)
         self.layout.add_widget(self.add_to_cart_input)
         self.layout.add_widget(self.add_to_cart_button)
@@ -59,10 +91,81 @@ class BookStoreApp(App):
         self.layout.add_widget(self.remove_from_cart_button)
         self.layout.add_widget(self.show_cart_button)
         self.layout.add_widget(self.save_order_button)
+        self.layout.add_widget(self.cart_status)
         self.layout.add_widget(self.cart_list)
 
+        # Элементы, которые работают только с загруженным магазином
+        self.store_widgets = [
+            self.search_input, self.show_books_button, self.show_magazines_button,
+            self.show_newspapers_button, self.add_to_cart_input, self.add_to_cart_button,
+            self.remove_from_cart_input, self.remove_from_cart_button, self.show_cart_button,
+            self.save_order_button
+        ]
+        for widget in self.store_widgets:
+            widget.disabled = True
+        self.book_status.text = "Загрузка каталога..."
+
+        Clock.schedule_once(self.on_first_frame)
+        threading.Thread(target=self.load_store, name='store-loader', daemon=True).start()
         return self.layout
 
+    def on_first_frame(self, dt):
+        self.startup_times['first_frame'] = time.time()
+
+    def load_store(self):
+        # Выполняется в фоновом потоке: импорт модулей магазина, открытие БД,
+        # проверка схемы и заполнение пустого каталога
+        try:
+            from library import Store
+            from persistence import OrderWriter
+            store = Store()
+            # Заказы пишутся в базу фоновым потоком, чтобы интерфейс не ждал диск
+            order_writer = OrderWriter(store.db_path, store.journal)
+        except Exception as error:
+            Clock.schedule_once(partial(self.on_store_failed, error))
+            return
+        Clock.schedule_once(partial(self.on_store_ready, store, order_writer))
+        # Поисковый индекс строится в этом же потоке уже после того, как интерфейс стал доступен
+        store.build_search_index(rebuild=False)
+
+    def on_store_failed(self, error, dt):
+        self.book_status.text = f"Не удалось загрузить каталог: {error}"
+
+    def on_store_ready(self, store, order_writer, dt):
+        # Магазин загружен - включаем элементы интерфейса (вызывается в главном потоке)
+        self.store = store
+        self.order_writer = order_writer
+        for widget in self.store_widgets:
+            widget.disabled = False
+        self.book_status.text = "Выберите категорию или введите запрос для поиска."
+        self.startup_times['store_ready'] = time.time()
+        if STARTUP_PROBE:
+            with open(STARTUP_PROBE, 'w', encoding='utf-8') as file:
+                json.dump(self.startup_times, file)
+            self.stop()
+
+    def on_search_text(self, instance, text):
+        # Перезапускаем отсчет паузы при каждом изменении текста
+        self._search_trigger.cancel()
+        self._search_trigger()
+
+    @log_scenario("Поиск товаров")
+    def run_search(self, dt):
+        query = self.search_input.text.strip()
+        if not query:
+            return
+        if self.store.search_index is None:
+            # Индекс еще строится в фоне - не блокируем интерфейс его построением
+            self.book_status.text = "Поиск готовится, попробуйте через несколько секунд..."
+            return
+        products = self.store.search(query)
+        if products:
+            self.book_status.text = f"Найдено по запросу «{query}»:"
+            self.book_list.show_rows([str(product) for product in products])
+        else:
+            self.book_status.text = f"По запросу «{query}» ничего не найдено."
+            self.book_list.clear()
+
     # Обертки для методов с логированием
     def show_category_wrapper(self, instance, category):
         self.log_action(f"show_{category}")
@@ -94,13 +197,13 @@ class BookStoreApp(App):
             if success:
                 # Очищаем поле ввода
                 self.add_to_cart_input.text = ''
-                self.book_list.text += "\n\nТовар с артикулом " + str(article) + " добавлен в корзину!"
+                self.book_status.text = "Товар с артикулом " + str(article) + " добавлен в корзину!"
             else:
-                self.book_list.text += "\n\nОшибка: Товар с артикулом " + str(article) + " не найден."
+                self.book_status.text = "Ошибка: Товар с артикулом " + str(article) + " не найден."
         except ValueError:
-            self.book_list.text += "\n\nОшибка: Введите артикул товара (число)."
+            self.book_status.text = "Ошибка: Введите артикул товара (число)."
         except PostConditionError as e:
-            print(f"Постусловие после добавления в корзину не выполнено: {e}")
+            ui_logger.warning("Постусловие после добавления в корзину не выполнено: %s", e)
 
     def remove_from_cart_wrapper(self, instance, *args):
         self.log_action("remove_from_cart")
@@ -119,31 +222,40 @@ class BookStoreApp(App):
     def show_category(self, instance, category):
         # Сохраняем текущую категорию
         self.current_category = category
-        products = self.store.list_products(category)
         category_names = {
             'books': 'Книги',
             'magazines': 'Журналы',
             'newspapers': 'Газеты'
         }
-        product_list = []
-        for product in products:
-            product_list.append(f'{str(product)}')
-        
-        self.book_list.text = f"{category_names[category]}:\n" + "\n".join(product_list)
+        self.book_status.text = f"{category_names[category]}: {self.store.count_products(category)}"
+        self.book_list.show(self.category_pages(category))
+
+    def category_pages(self, category):
+        # Страницы категории для списка: каждая следующая начинается после последнего
+        # показанного артикула, поэтому глубокая прокрутка не замедляется
+        last_article = [None]
+
+        def fetch_page(offset, limit):
+            products = self.store.list_products(category, limit=limit, after=last_article[0])
+            if products:
+                last_article[0] = products[-1].article
+            return [str(product) for product in products]
+        return fetch_page
 
     @log_scenario("Удаление товара из корзины")
     def remove_from_cart(self, instance, *args):
         try:
-            # Преобразуем введенный номер товара в индекс
-            item_index = int(self.remove_from_cart_input.text) - 1
-            # Удаляем товар из корзины
-            self.store.remove_from_cart(item_index)
+            # Корзина хранит товары по артикулу
+            article = int(self.remove_from_cart_input.text)
+        except ValueError:
+            self.cart_status.text = "Ошибка: Введите артикул товара для удаления."
+            return
+        # Убираем из корзины одну штуку товара
+        if self.store.remove_from_cart(article, quantity=1):
             # Очищаем поле ввода
             self.remove_from_cart_input.text = ''
-        except ValueError:
-            self.cart_list.text = "Ошибка: Введите номер товара для удаления."
-        except IndexError:
-            self.cart_list.text = "Ошибка: Товары с таким номером в корзине не существуют."
+        else:
+            self.cart_status.text = "Ошибка: Товара с таким артикулом в корзине нет."
 
     @log_scenario("Отображение корзины")
     def show_cart(self, instance, *args):
@@ -157,24 +269,61 @@ class BookStoreApp(App):
                 'magazines': 'Журнал',
                 'newspapers': 'Газета'
             }
-            
-            # Если корзина не пуста, показываем её содержимое и общую стоимость
-            cart_items = []
-            for i, item in enumerate(cart):
-                product = item['item']
-                category = item['category']
-                cart_items.append(f'{i + 1}. [{category_names.get(category, "Товар")}] {str(product)}')
-                
+
+            # Строки корзины берутся страницами, только по мере прокрутки списка
+            def fetch_page(offset, limit):
+                rows = []
+                for i, line in enumerate(cart.page(offset, limit), start=offset + 1):
+                    category = category_names.get(line.category, "Товар")
+                    rows.append(f'{i}. [{category}] {str(line.product)} | Кол-во: {line.quantity}')
+                return rows
+
+            # Сумма хранится в корзине и не пересчитывается при каждом показе
             total = self.store.calculate_cart_total()
-            self.cart_list.text = "Ваша корзина:\n" + "\n".join(cart_items) + f"\n\nОбщая стоимость: {total} руб."
+            self.cart_status.text = f"Ваша корзина: {cart.items_count} шт. | Общая стоимость: {total} руб."
+            self.cart_list.show(fetch_page)
         else:
-            self.cart_list.text = "Ваша корзина пуста."
+            self.cart_status.text = "Ваша корзина пуста."
+            self.cart_list.clear()
 
     @log_scenario("Сохранение заказа")
     def save_order(self, instance, *args):
-        # Сохраняем заказ в базу данных
-        self.store.save_order()
-        self.cart_list.text = "Заказ сохранен в базе данных!"
+        # Забираем корзину и отдаем заказ фоновому потоку записи
+        items, journal_key = self.store.take_cart()
+        if not items:
+            self.cart_status.text = "Ваша корзина пуста."
+            return
+        self.cart_list.clear()
+        from library import cart_order_lines
+        lines = cart_order_lines(items)
+        try:
+            # Обработчики вызываются из потока записи, поэтому обновление интерфейса
+            # переносим в главный поток через Clock
+            self.order_writer.submit(
+                lines,
+                on_done=lambda order_id: Clock.schedule_once(partial(self.order_saved, order_id)),
+                on_error=lambda error: Clock.schedule_once(partial(self.order_failed, items, journal_key, error)),
+                journal_key=journal_key
+            )
+        except queue.Full:
+            # Очередь записи переполнена - возвращаем товары в корзину
+            self.store.restore_cart(items, journal_key=journal_key)
+            self.cart_status.text = "Ошибка: база данных занята, попробуйте сохранить заказ еще раз."
+            return
+        self.cart_status.text = "Заказ сохраняется..."
+
+    def order_saved(self, order_id, dt):
+        self.cart_status.text = f"Заказ №{order_id} сохранен в базе данных!"
+
+    def order_failed(self, items, journal_key, error, dt):
+        # Заказ не записан - возвращаем товары в корзину, чтобы его можно было повторить
+        self.store.restore_cart(items, journal_key=journal_key)
+        self.cart_status.text = f"Ошибка сохранения заказа: {error}"
+
+    def on_stop(self):
+        # При выходе дописываем все заказы из очереди, чтобы ни один не потерялся
+        if self.order_writer is not None:
+            self.order_writer.close()
 
     def add_to_cart_wrapper(self, instance, *args):
         self.log_action("add_to_cart")
@@ -186,8 +335,8 @@ class BookStoreApp(App):
 # Миксин для логирования действий
 class LoggingMixin:
     def log_action(self, action_name):
-        # Логируем действие пользователя
-        print(f"Действие пользователя: {action_name}")
+        # Логируем действие пользователя (запись уходит в очередь журнала, см. logs.py)
+        ui_logger.info("Действие пользователя: %s", action_name)
 
 # Метакласс для регистрации действий
 # Метакласс - это класс, который создает другие классы
@@ -207,8 +356,11 @@ class ActionRegistryMeta(type):
             # Проверяем, является ли атрибут методом, начинающимся с 'action_'
             if name_attr.startswith('action_') and callable(value):
                 # Удаляем префикс 'action_' и добавляем метод в словарь действий
-                # Например: 'action_test_action' станет 'test_action'
-                actions[name_attr[7:]] = value
+                # Например: 'action_test_action' станет 'test_action'.
+                # Метод оборачивается замером времени (decorators.timed_action), и обертка
+                # заменяет его и в классе, поэтому прямой вызов self.action_... тоже учитывается
+                action_name = name_attr[7:]
+                actions[action_name] = attrs[name_attr] = timed_action(action_name, value)
 
         # Добавляем словарь actions в атрибуты класса
         # Теперь к нему можно обращаться через self.actions
@@ -226,18 +378,21 @@ class LoggedBookStoreApp(BookStoreApp, LoggingMixin, metaclass=ActionRegistryMet
 
     # Новое полезное действие - очистка корзины
     def action_clear_cart(self, instance, *args):
-        self.store.cart.clear()
-        self.cart_list.text = "Корзина очищена!"
-        print("Корзина успешно очищена")
+        self.store.clear_cart()
+        self.cart_list.clear()
+        self.cart_status.text = "Корзина очищена!"
+        ui_logger.info("Корзина успешно очищена")
 
     # Обертки для действий с правильной передачей аргументов
+    # В словаре actions лежат функции класса, поэтому self передается явно
     def test_action_wrapper(self, instance, *args):
-        self.actions['test_action'](instance, *args)
+        self.actions['test_action'](self, instance, *args)
 
     def clear_cart_wrapper(self, instance, *args):
-        self.actions['clear_cart'](instance, *args)
+        self.actions['clear_cart'](self, instance, *args)
 
     def build(self):
+        from kivy.uix.button import Button
         layout = super().build()
 
         # Кнопка для тестового действия
@@ -248,6 +403,10 @@ class LoggedBookStoreApp(BookStoreApp, LoggingMixin, metaclass=ActionRegistryMet
         clear_cart_button = Button(text='Очистить корзину')
         clear_cart_button.bind(on_press=self.clear_cart_wrapper)
 
+        # Очистка корзины доступна только после загрузки магазина
+        clear_cart_button.disabled = True
+        self.store_widgets.append(clear_cart_button)
+
         # Добавляем кнопки в интерфейс
         layout.add_widget(test_button)
         layout.add_widget(clear_cart_button)
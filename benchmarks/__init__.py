@@ -0,0 +1,2 @@
+# benchmarks
+# Замеры производительности магазина, запускаются без Kivy: python -m benchmarks.<модуль>
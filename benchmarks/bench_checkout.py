@@ -0,0 +1,87 @@
+# benchmarks/bench_checkout.py
+# 16 касс (отдельных процессов со своим Store на общей store.db) одновременно покупают
+# один и тот же бестселлер. Проверяем, что продано ровно столько, сколько было на складе,
+# остаток не ушел в минус, и замеряем задержку оформления заказа
+# Запуск: python -m benchmarks.bench_checkout [касс] [заказов на кассу]
+import contextlib
+import io
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+TERMINALS = 16
+ORDERS = 100
+BESTSELLER = 10
+
+
+def terminal(db_path, orders, start, results):
+    from library import Store
+    from stock import OutOfStockError
+    with contextlib.redirect_stdout(io.StringIO()):
+        store = Store(db_path)
+        start.wait()
+        sold, rejected, timings = 0, 0, []
+        for _ in range(orders):
+            if not store.add_to_cart(BESTSELLER):
+                # Кэш остатков уже знает, что товар закончился
+                rejected += 1
+                continue
+            begin = time.perf_counter()
+            try:
+                store.save_order()
+                sold += 1
+            except OutOfStockError:
+                store.clear_cart()
+                rejected += 1
+            timings.append((time.perf_counter() - begin) * 1000)
+    results.put((sold, rejected, timings))
+
+
+def main():
+    terminals = int(sys.argv[1]) if len(sys.argv) > 1 else TERMINALS
+    orders = int(sys.argv[2]) if len(sys.argv) > 2 else ORDERS
+    # На складе меньше, чем хотят купить все кассы вместе
+    stock = terminals * orders * 3 // 4
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'store.db')
+        from library import Store
+        with contextlib.redirect_stdout(io.StringIO()):
+            store = Store(db_path)
+        store.set_stock(BESTSELLER, stock)
+
+        start = multiprocessing.Barrier(terminals + 1)
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=terminal, args=(db_path, orders, start, results))
+                     for _ in range(terminals)]
+        for process in processes:
+            process.start()
+        start.wait()
+        begin = time.perf_counter()
+        collected = [results.get() for _ in processes]
+        elapsed = time.perf_counter() - begin
+        for process in processes:
+            process.join()
+
+        sold = sum(result[0] for result in collected)
+        rejected = sum(result[1] for result in collected)
+        timings = sorted(timing for result in collected for timing in result[2])
+        left = store.available(BESTSELLER)
+        ordered = store.conn.execute('SELECT COALESCE(SUM(quantity), 0) FROM order_items WHERE article = ?',
+                                     (BESTSELLER,)).fetchone()[0]
+        store.connections.close()
+
+    print(f"касс: {terminals}, попыток: {terminals * orders}, на складе было: {stock}")
+    print(f"продано: {sold}, в заказах: {ordered}, отказов: {rejected}, осталось: {left}")
+    print(f"заказов в секунду: {sold / elapsed:,.0f}")
+    print(f"задержка оформления, мс: p50 {statistics.median(timings):.2f}, "
+          f"p99 {timings[int(len(timings) * 0.99) - 1]:.2f}, макс {timings[-1]:.2f}")
+    correct = sold == stock == ordered and left == 0
+    print("остатки сходятся" if correct else "ОШИБКА: остатки не сходятся")
+    return 0 if correct else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,39 @@
+# benchmarks/bench_contracts.py
+# Микро-бенчмарк создания Book в каждом режиме контрактов check_conditions.
+# Режим применяется при импорте book.py, поэтому каждый режим замеряется в отдельном процессе
+# Запуск: python -m benchmarks.bench_contracts
+import os
+import subprocess
+import sys
+import timeit
+
+MODES = ('always', 'sampled', 'off')
+NUMBER = 200000
+
+
+# Замер внутри дочернего процесса: наносекунды на одно создание книги
+def child():
+    from book import Book
+    timer = timeit.Timer(lambda: Book('Война и мир', 'Лев Толстой', 500, 'Роман', 10))
+    best = min(timer.repeat(repeat=5, number=NUMBER))
+    print(best / NUMBER * 1e9)
+
+
+def main():
+    results = {}
+    for mode in MODES:
+        env = dict(os.environ, STORE_CONTRACTS=mode)
+        output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_contracts', '--child'],
+                                env=env, capture_output=True, text=True, check=True).stdout
+        results[mode] = float(output.strip().splitlines()[-1])
+
+    print(f"{'режим':>8} {'нс на Book':>12} {'к always':>10}")
+    for mode in MODES:
+        print(f"{mode:>8} {results[mode]:>12.1f} {results[mode] / results['always']:>10.2f}")
+
+
+if __name__ == '__main__':
+    if '--child' in sys.argv:
+        child()
+    else:
+        main()
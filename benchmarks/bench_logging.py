@@ -0,0 +1,52 @@
+# benchmarks/bench_logging.py
+# Стоимость записи в журнал для вызывающего потока: старый print с форматированием
+# против очереди logs.py (форматирование и запись в файл - в фоновом потоке).
+# Каждый способ замеряется в отдельном процессе; вывод print идет в файл, как при перенаправлении
+# Запуск: python -m benchmarks.bench_logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+CALLS = 100000
+DATA = ('Война и мир', 'Лев Толстой', 500, 'Роман')
+
+
+def child(mode):
+    if mode == 'print':
+        def log(number):
+            print(f"Database Action: INSERT on table 'orders' with data: {DATA + (number,)}")
+    else:
+        from library import DatabaseLoggingMixin
+        mixin = DatabaseLoggingMixin()
+
+        def log(number):
+            mixin.log_db_action("INSERT", "orders", "%s", DATA + (number,))
+    start = time.perf_counter()
+    for number in range(CALLS):
+        log(number)
+    sys.stderr.write(f"{(time.perf_counter() - start) / CALLS * 1e6}\n")
+
+
+def main():
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for mode, extra in (('print', {}), ('очередь', {}), ('очередь, WARNING', {'STORE_LOG_LEVEL': 'WARNING'})):
+            env = dict(os.environ, STORE_LOG_FILE=os.path.join(directory, 'store.log'), **extra)
+            with open(os.path.join(directory, 'stdout.txt'), 'w') as stdout:
+                output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_logging', '--child',
+                                         'print' if mode == 'print' else 'queue'],
+                                        env=env, stdout=stdout, stderr=subprocess.PIPE, text=True, check=True).stderr
+            results[mode] = float(output.strip().splitlines()[-1])
+
+    print(f"{'способ':>18} {'мкс на запись':>14}")
+    for mode, value in results.items():
+        print(f"{mode:>18} {value:>14.2f}")
+
+
+if __name__ == '__main__':
+    if '--child' in sys.argv:
+        child(sys.argv[-1])
+    else:
+        main()
@@ -0,0 +1,61 @@
+# benchmarks/bench_memory.py
+# Память на один товар: объекты Book/Magazine/Newspaper и колоночный Catalog
+# Запуск: python -m benchmarks.bench_memory [количество]
+import sys
+import tracemalloc
+
+from book import Book, Magazine, Newspaper
+
+COUNT = 100000
+
+
+# Синтетические строки каталога в формате таблицы products.
+# Строки создаются заново для каждой позиции, как при чтении из курсора SQLite
+def synthetic_rows(count):
+    genres = ['Роман', 'Классика', 'Фантастика', 'Наука', 'Политика']
+    for article in range(count):
+        category = ('books', 'magazines', 'newspapers')[article % 3]
+        genre = 'Газета' if category == 'newspapers' else genres[article % len(genres)]
+        date = '2024-03-' + str(20 + article % 5) if category == 'newspapers' else None
+        yield (article, category, f'Название {article}', f'Автор {article % 1000}', 100.0 + article % 900,
+               ''.join(genre), date)
+
+
+# Объект товара по строке (как Store._build_product)
+def build_object(row):
+    article, category, title, author, price, genre, date_published = row
+    if category == 'newspapers':
+        return Newspaper(title, author, price, date_published, article)
+    if category == 'magazines':
+        return Magazine(title, author, price, genre, article)
+    return Book(title, author, price, genre, article)
+
+
+# Байт на товар: память, которую контейнер удерживает после загрузки count строк
+# (включая сами строки, числа и служебные структуры)
+def measure(build, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    container = build(synthetic_rows(count))
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count, container
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else COUNT
+    results = [('объекты товаров', measure(lambda rows: [build_object(row) for row in rows], count)[0])]
+    try:
+        from catalog import Catalog
+    except ImportError:
+        Catalog = None
+    if Catalog is not None:
+        results.append(('колоночный Catalog', measure(Catalog.from_rows, count)[0]))
+
+    print(f"товаров: {count}")
+    for name, per_item in results:
+        print(f"{name:>20}: {per_item:8.1f} байт на товар")
+
+
+if __name__ == '__main__':
+    main()
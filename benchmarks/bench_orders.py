@@ -0,0 +1,106 @@
+# benchmarks/bench_orders.py
+# Замер задержки оформления заказа в зависимости от размера корзины.
+# Условия у всех вариантов одинаковые: соединения из database.connect (WAL, synchronous=NORMAL),
+# а вывод уходит в файл - старый print в файл с построчной буферизацией (запись на каждую строку,
+# как в консоль), журнал магазина - через очередь logs.py в свой файл.
+# Варианты:
+# - построчно: старая схема, INSERT и print на каждую строку корзины, один commit;
+# - executemany: та же таблица, одна вставка всех строк и одна запись в журнал на заказ;
+# - save_order: полный Store.save_order (заголовок и строки заказа, списание остатков,
+#   сводки продаж, очистка журнала корзины)
+# Запуск: python -m benchmarks.bench_orders
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import time
+
+# Журнал магазина пишем в файл во временном каталоге, а не в store.log рабочего каталога.
+# logs.py читает переменную при импорте, поэтому задаем ее до импорта library
+os.environ.setdefault('STORE_LOG_FILE', os.path.join(tempfile.gettempdir(), 'bench_orders.log'))
+os.environ.setdefault('STORE_SCENARIO_ECHO', '0')
+
+from book import Book
+from database import connect
+from library import Store, db_logger
+
+CART_SIZES = (1, 10, 50, 200)
+REPEATS = 20
+
+LEGACY_TABLE = '''CREATE TABLE orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_title TEXT,
+    author TEXT,
+    price REAL,
+    genre TEXT
+)'''
+
+
+# Старый способ: отдельный execute и print на каждую строку корзины
+def legacy_save_order(conn, cart, sink):
+    cursor = conn.cursor()
+    for product in cart:
+        order_data = (product.title, product.author, product.price, product.genre)
+        print(f"Database Action: INSERT on table 'orders' with data: {order_data}", file=sink)
+        cursor.execute('INSERT INTO orders (product_title, author, price, genre) VALUES (?, ?, ?, ?)', order_data)
+    conn.commit()
+
+
+# Та же запись одной вставкой и одной строкой журнала на заказ
+def batched_save_order(conn, cart):
+    with conn:
+        conn.executemany('INSERT INTO orders (product_title, author, price, genre) VALUES (?, ?, ?, ?)',
+                         [(product.title, product.author, product.price, product.genre) for product in cart])
+    db_logger.info("Database Action: INSERT on table 'orders' with data: %s items", len(cart))
+
+
+def measure(func, setup=None):
+    # Медиана в миллисекундах по REPEATS запускам; setup не входит в замер
+    timings = []
+    for _ in range(REPEATS):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            store = Store(os.path.join(tmp, 'store.db'))
+        legacy = connect(os.path.join(tmp, 'legacy.db'))
+        legacy.execute(LEGACY_TABLE)
+        batched = connect(os.path.join(tmp, 'batched.db'))
+        batched.execute(LEGACY_TABLE)
+        sink = open(os.path.join(tmp, 'legacy.log'), 'w', encoding='utf-8', buffering=1)
+        # Отдельный артикул на каждую строку корзины, остатков хватает на все повторы
+        for article in range(1000, 1000 + max(CART_SIZES)):
+            store.add_product(Book(f'Книга {article}', 'Автор', 100, 'Роман', article))
+            store.set_stock(article, REPEATS * len(CART_SIZES))
+        products = [store.get_by_article(article) for article in range(1000, 1000 + max(CART_SIZES))]
+
+        results = []
+        for size in CART_SIZES:
+            def fill_cart():
+                for article in range(1000, 1000 + size):
+                    store.add_to_cart(article)
+            cart = products[:size]
+            legacy_ms = measure(lambda: legacy_save_order(legacy, cart, sink))
+            batched_ms = measure(lambda: batched_save_order(batched, cart))
+            store_ms = measure(store.save_order, setup=fill_cart)
+            results.append((size, legacy_ms, batched_ms, store_ms))
+        sink.close()
+        legacy.close()
+        batched.close()
+        store.connections.close()
+
+    print(f"{'строк':>6} {'построчно, мс':>15} {'executemany, мс':>17} {'save_order, мс':>16}")
+    for size, legacy_ms, batched_ms, store_ms in results:
+        print(f"{size:>6} {legacy_ms:>15.3f} {batched_ms:>17.3f} {store_ms:>16.3f}")
+
+
+if __name__ == '__main__':
+    main()
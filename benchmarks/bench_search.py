@@ -0,0 +1,48 @@
+# benchmarks/bench_search.py
+# Задержка поиска по мере ввода на большом синтетическом каталоге
+# Запуск: python -m benchmarks.bench_search [количество названий]
+import random
+import statistics
+import sys
+import time
+
+from search import SearchIndex
+
+COUNT = 500000
+SYLLABLES = ['ка', 'ро', 'ми', 'ла', 'ве', 'ст', 'ан', 'ни', 'то', 'ль', 'ёж', 'пр', 'да', 'мо', 'ре', 'ки']
+# Запросы в том виде, в каком их набирает покупатель: по буквам
+QUERIES = ['к', 'ка', 'кар', 'карол', 'ми ла', 'весто', 'ро ка ми', 'ёж', 'Толстой', 'ан ни то']
+
+
+def word(rng):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def synthetic_rows(count, seed=1):
+    rng = random.Random(seed)
+    vocabulary = [word(rng) for _ in range(20000)]
+    authors = [f'{word(rng).capitalize()} {word(rng).capitalize()}' for _ in range(5000)]
+    for article in range(count):
+        title = ' '.join(rng.choice(vocabulary) for _ in range(rng.randint(1, 5))).capitalize()
+        yield article, title, rng.choice(authors)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else COUNT
+    index = SearchIndex()
+    start = time.perf_counter()
+    index.build(synthetic_rows(count))
+    print(f"построение индекса на {count} названий: {time.perf_counter() - start:.2f} сек.")
+
+    print(f"{'запрос':>12} {'найдено':>8} {'медиана, мс':>12} {'макс, мс':>9}")
+    for query in QUERIES:
+        timings = []
+        for _ in range(20):
+            start = time.perf_counter()
+            found = index.search(query, limit=20)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"{query:>12} {len(found):>8} {statistics.median(timings):>12.3f} {max(timings):>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# benchmarks/bench_server.py
+# Нагрузка на HTTP API магазина (server.py): N касс на localhost одновременно открывают сессию,
+# листают каталог, ищут товар, собирают корзину и оформляют заказ по keep-alive соединениям.
+# Сервер запускается отдельным процессом на временной базе. Печатаем запросов в секунду
+# и задержки по маршрутам
+# Запуск: python -m benchmarks.bench_server [касс] [покупок на кассу]
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TERMINALS = 16
+PURCHASES = 50
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# Касса: одно keep-alive соединение, запросы по очереди
+class Terminal:
+    def __init__(self, reader, writer, timings):
+        self.reader = reader
+        self.writer = writer
+        self.timings = timings
+
+    async def request(self, method, path, payload=None, route=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\n'
+                          f'Content-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body)
+        begin = time.perf_counter()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+        data = json.loads(await self.reader.readexactly(length))
+        self.timings.setdefault(route or f'{method} {path}', []).append((time.perf_counter() - begin) * 1000)
+        if status >= 400:
+            raise RuntimeError(f'{method} {path}: {status} {data}')
+        return data
+
+
+async def wait_ready(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+async def shopping(port, purchases, timings):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    terminal = Terminal(reader, writer, timings)
+    session_id = (await terminal.request('POST', '/sessions'))['session_id']
+    cart = f'/sessions/{session_id}/cart'
+    page = await terminal.request('GET', '/products?category=books&limit=20', route='GET /products')
+    articles = [product['article'] for product in page['products']]
+    orders = 0
+    for number in range(purchases):
+        await terminal.request('GET', '/search?q=%D0%B2%D0%BE%D0%B9', route='GET /search')
+        for article in articles[number % len(articles):][:3]:
+            await terminal.request('GET', f'/products/{article}', route='GET /products/<article>')
+            await terminal.request('POST', cart, {'article': article, 'quantity': 1}, route='POST cart')
+        await terminal.request('GET', cart, route='GET cart')
+        await terminal.request('POST', f'/sessions/{session_id}/checkout', route='POST checkout')
+        orders += 1
+    await terminal.request('DELETE', f'/sessions/{session_id}', route='DELETE session')
+    writer.close()
+    return orders
+
+
+async def run(port, terminals, purchases):
+    await wait_ready(port)
+    timings = {}
+    begin = time.perf_counter()
+    orders = await asyncio.gather(*(shopping(port, purchases, timings) for _ in range(terminals)))
+    return time.perf_counter() - begin, sum(orders), timings
+
+
+def main():
+    terminals = int(sys.argv[1]) if len(sys.argv) > 1 else TERMINALS
+    purchases = int(sys.argv[2]) if len(sys.argv) > 2 else PURCHASES
+    port = free_port()
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, STORE_LOG_FILE='', STORE_SCENARIO_ECHO='0')
+        server = subprocess.Popen([sys.executable, os.path.join(REPO_DIR, 'server.py'), '--port', str(port),
+                                   '--db', os.path.join(directory, 'store.db')], cwd=directory, env=env)
+        try:
+            elapsed, orders, timings = asyncio.run(run(port, terminals, purchases))
+        finally:
+            server.terminate()
+            server.wait()
+
+    requests = sum(len(values) for values in timings.values())
+    print(f"касс: {terminals}, заказов: {orders}, запросов: {requests}")
+    print(f"запросов в секунду: {requests / elapsed:,.0f}, заказов в секунду: {orders / elapsed:,.0f}")
+    for route, values in sorted(timings.items()):
+        values.sort()
+        print(f"  {route:<24} p50 {statistics.median(values):7.2f} мс, "
+              f"p99 {values[max(int(len(values) * 0.99) - 1, 0)]:7.2f} мс")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+# benchmarks/bench_snapshots.py
+# Чтение каталога во время массовой переоценки: потоки-читатели листают страницы книг,
+# пока писатель раз за разом поднимает цены всех книг на 1 рубль.
+# У всех книг одна начальная цена, поэтому на согласованной странице все цены равны;
+# страница с разными ценами - "рваное" чтение наполовину примененной переоценки.
+# Замеряем страниц в секунду без писателя и с ним и считаем рваные страницы
+# Запуск: python -m benchmarks.bench_snapshots [товаров] [читателей] [секунд]
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Как в bench_startup: сценарии не печатаются, иначе замер мерил бы вывод в консоль.
+# Реестр метрик читает переменную при импорте, поэтому задаем ее до импорта library
+os.environ.setdefault('STORE_SCENARIO_ECHO', '0')
+
+from benchmarks.bench_suite import synthetic_products
+from library import Store, PRODUCT_COLUMNS
+
+COUNT = 30000
+READERS = 4
+SECONDS = 3
+PAGE = 100
+PRICE = 100
+
+
+def fill_books(store, count):
+    conn = store.conn
+    with conn:
+        conn.executemany(f'INSERT INTO products ({PRODUCT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         ((article, 'books', title, author, PRICE, genre, None)
+                          for article, _, title, author, _, genre, _ in synthetic_products(count)))
+
+
+def reader(store, stop, results):
+    pages = torn = 0
+    after = None
+    held = []
+    while not stop.is_set():
+        page = store.list_products('books', limit=PAGE, after=after)
+        if len({product.price for product in page}) > 1:
+            torn += 1
+        pages += 1
+        after = page[-1].article if len(page) == PAGE else None
+        # Часть страниц держим, как интерфейс держит видимые товары
+        held = (held + [page])[-20:]
+    results.append((pages, torn))
+
+
+def writer(store, stop, counter):
+    while not stop.is_set():
+        store.reprice(amount=1, category='books')
+        counter.append(1)
+
+
+def run(store, readers, seconds, with_writer):
+    stop = threading.Event()
+    results = []
+    repricings = []
+    threads = [threading.Thread(target=reader, args=(store, stop, results)) for _ in range(readers)]
+    if with_writer:
+        threads.append(threading.Thread(target=writer, args=(store, stop, repricings)))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    pages = sum(result[0] for result in results)
+    torn = sum(result[1] for result in results)
+    return pages / seconds, torn, len(repricings)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else COUNT
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else READERS
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else SECONDS
+    with tempfile.TemporaryDirectory() as directory:
+        with contextlib.redirect_stdout(io.StringIO()):
+            store = Store(os.path.join(directory, 'store.db'))
+        store.conn.execute('DELETE FROM products')
+        store.conn.commit()
+        fill_books(store, count)
+
+        idle, idle_torn, _ = run(store, readers, seconds, False)
+        busy, busy_torn, repricings = run(store, readers, seconds, True)
+        store.connections.close()
+
+    print(f"книг: {count}, читателей: {readers}, страница: {PAGE}")
+    print(f"без писателя: {idle:,.0f} страниц/с, рваных: {idle_torn}")
+    print(f"с переоценкой: {busy:,.0f} страниц/с ({busy / idle:.0%}), рваных: {busy_torn}, "
+          f"переоценок: {repricings}")
+    return 1 if idle_torn or busy_torn else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
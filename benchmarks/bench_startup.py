@@ -0,0 +1,102 @@
+# benchmarks/bench_startup.py
+# Время холодного запуска: импорт модулей, создание Store на новой базе и (если установлен Kivy)
+# появление первого кадра и готовность магазина в приложении.
+# Каждый замер - в отдельном процессе, результат - медиана нескольких запусков.
+# Превышение бюджета из startup_budget.json завершает процесс с кодом 1
+# Запуск: python -m benchmarks.bench_startup [--runs N]
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RUNS = 5
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+BUDGET_FILE = os.path.join(BENCH_DIR, 'startup_budget.json')
+
+# Код дочерних процессов: печатает время в миллисекундах
+CHILD_IMPORT = '''
+import time
+start = time.perf_counter()
+import library
+print((time.perf_counter() - start) * 1000)
+'''
+
+CHILD_STORE = '''
+import sys, time
+from library import Store
+start = time.perf_counter()
+Store(sys.argv[1])
+print((time.perf_counter() - start) * 1000)
+'''
+
+
+def run_child(code, *args, env=None):
+    env = dict(os.environ if env is None else env, STORE_SCENARIO_ECHO='0')
+    output = subprocess.run([sys.executable, '-c', code, *args], env=env, cwd=REPO_DIR,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_import(runs):
+    return statistics.median(run_child(CHILD_IMPORT) for _ in range(runs))
+
+
+def measure_store(runs):
+    results = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as directory:
+            results.append(run_child(CHILD_STORE, os.path.join(directory, 'store.db')))
+    return statistics.median(results)
+
+
+def measure_app(runs):
+    # Приложение само пишет отметки времени в файл STORE_STARTUP_PROBE и закрывается.
+    # Рабочий каталог - временный, поэтому store.db каждый раз создается заново
+    first_frame, store_ready = [], []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as directory:
+            probe = os.path.join(directory, 'startup.json')
+            start = time.time()
+            subprocess.run([sys.executable, os.path.join(REPO_DIR, 'app.py')], cwd=directory,
+                           env=dict(os.environ, STORE_STARTUP_PROBE=probe, STORE_SCENARIO_ECHO='0'),
+                           capture_output=True, check=True, timeout=60)
+            with open(probe, encoding='utf-8') as file:
+                times = json.load(file)
+            first_frame.append((times['first_frame'] - start) * 1000)
+            store_ready.append((times['store_ready'] - start) * 1000)
+    return statistics.median(first_frame), statistics.median(store_ready)
+
+
+def main():
+    runs = int(sys.argv[sys.argv.index('--runs') + 1]) if '--runs' in sys.argv else RUNS
+    results = {
+        'import_library_ms': measure_import(runs),
+        'store_init_ms': measure_store(runs)
+    }
+    if importlib.util.find_spec('kivy') is not None:
+        results['first_frame_ms'], results['store_ready_ms'] = measure_app(runs)
+    else:
+        print("Kivy не установлен: замер окна приложения пропущен")
+
+    with open(BUDGET_FILE, encoding='utf-8') as file:
+        budget = json.load(file)
+
+    failed = False
+    print(f"{'замер':>18} {'медиана, мс':>12} {'бюджет, мс':>11}")
+    for name, value in results.items():
+        limit = budget.get(name)
+        over = limit is not None and value > limit
+        failed = failed or over
+        mark = '  ПРЕВЫШЕН' if over else ''
+        limit_text = '-' if limit is None else f'{limit:.0f}'
+        print(f"{name:>18} {value:>12.1f} {limit_text:>11}{mark}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
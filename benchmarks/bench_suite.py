@@ -0,0 +1,198 @@
+# benchmarks/bench_suite.py
+# Сводный бенчмарк магазина без Kivy: синтетические каталоги и корзины размером 1e3..1e6,
+# время каждой операции Store (включая массовую переоценку) и создания Book.
+# Результат пишется в JSON и сравнивается с сохраненным эталоном:
+# замедление больше допуска завершает процесс с кодом 1.
+# Запуск: python -m benchmarks.bench_suite [--sizes 1000,10000] [--output results.json]
+#         [--baseline benchmarks/baseline.json] [--tolerance 0.25] [--save-baseline]
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+# Сценарии не печатаются в консоль, иначе log_scenario форматировал бы вывод внутри замеров.
+# Реестр метрик читает переменную при импорте, поэтому задаем ее до импорта library
+os.environ.setdefault('STORE_SCENARIO_ECHO', '0')
+
+from book import Book
+from library import Store, PRODUCT_COLUMNS
+
+SIZES = (1000, 10000, 100000, 1000000)
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# Допустимое замедление относительно эталона (0.25 - на 25%)
+TOLERANCE = 0.25
+# Сколько вызовов быстрых операций замеряем
+CALLS = 2000
+PAGE = 50
+CATEGORY_NAMES = ('books', 'magazines', 'newspapers')
+
+
+# Синтетические строки таблицы products; артикулы начинаются после стартового каталога
+def synthetic_products(count, first_article=1000, seed=1):
+    rng = random.Random(seed)
+    authors = [f'Автор {number}' for number in range(max(1, count // 20))]
+    genres = ['Роман', 'Классика', 'Фантастика', 'Наука', 'Политика', 'Новости']
+    for article in range(first_article, first_article + count):
+        category = CATEGORY_NAMES[article % 3]
+        date = f'2024-01-{article % 28 + 1:02d}' if category == 'newspapers' else None
+        yield (article, category, f'Товар {article}', rng.choice(authors),
+               rng.randint(10, 5000), rng.choice(genres), date)
+
+
+def fill_catalog(store, count):
+    # Каталог заливается одной транзакцией напрямую в таблицу: это подготовка, а не замер
+    conn = store.conn
+    with conn:
+        conn.executemany(f'INSERT INTO products ({PRODUCT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         synthetic_products(count))
+    return list(range(1000, 1000 + count))
+
+
+def per_call(func, arguments):
+    # Микросекунды на вызов: медиана пяти проходов по списку аргументов
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for argument in arguments:
+            func(argument)
+        timings.append((time.perf_counter() - start) / len(arguments) * 1e6)
+    return statistics.median(timings)
+
+
+def once(func, repeats, setup=None):
+    # Миллисекунды на одну тяжелую операцию: медиана repeats запусков, setup не входит в замер
+    timings = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def bench_book():
+    arguments = range(CALLS * 50)
+    return {'book_init_us': per_call(lambda article: Book('Война и мир', 'Лев Толстой', 500, 'Роман', article),
+                                     arguments)}
+
+
+def bench_size(size, directory):
+    store = Store(os.path.join(directory, f'store_{size}.db'))
+    articles = fill_catalog(store, size)
+    rng = random.Random(size)
+    sample = [rng.choice(articles) for _ in range(CALLS)]
+    # Тяжелые операции на больших размерах повторяем реже
+    repeats = 5 if size <= 10000 else 3 if size <= 100000 else 1
+    middle = articles[len(articles) // 2]
+    results = {}
+
+    results['get_by_article_us'] = per_call(store.get_by_article, sample)
+    results['count_products_us'] = per_call(store.count_products, CATEGORY_NAMES * (CALLS // 30))
+    results['list_first_page_us'] = per_call(lambda category: store.list_products(category, limit=PAGE),
+                                             CATEGORY_NAMES * (CALLS // 30))
+    results['list_offset_page_us'] = per_call(
+        lambda category: store.list_products(category, offset=size // 6, limit=PAGE), CATEGORY_NAMES * 10)
+    results['list_keyset_page_us'] = per_call(
+        lambda category: store.list_products(category, after=middle, limit=PAGE), CATEGORY_NAMES * (CALLS // 30))
+    results['load_catalog_ms'] = once(store.load_catalog, repeats)
+    # Переоценка трети каталога (одна категория)
+    results['reprice_category_ms'] = once(lambda: store.reprice(percent=1, category='books'), repeats)
+
+    # Корзина из size разных товаров: добавление, сумма, оформление заказа
+    def fill_cart():
+        for article in articles:
+            store.add_to_cart(article)
+
+    start = time.perf_counter()
+    fill_cart()
+    results['add_to_cart_us'] = (time.perf_counter() - start) / size * 1e6
+    results['calculate_cart_total_us'] = per_call(lambda _: store.calculate_cart_total(), range(CALLS))
+    results['save_order_ms'] = once(store.save_order, 1)
+    if repeats > 1:
+        results['save_order_ms'] = once(store.save_order, repeats, setup=fill_cart)
+    store.connections.close()
+    return results
+
+
+def run(sizes):
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'results': {'book': bench_book()}
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            report['results'][str(size)] = bench_size(size, directory)
+    return report
+
+
+def compare(report, baseline, tolerance):
+    # Сравниваем только замеры, которые есть в обоих отчетах; возвращаем список регрессий
+    regressions = []
+    print(f"{'размер':>8} {'операция':>24} {'сейчас':>11} {'эталон':>11} {'отношение':>10}")
+    for group, values in report['results'].items():
+        reference = baseline.get('results', {}).get(group, {})
+        for name, value in values.items():
+            if name not in reference:
+                continue
+            ratio = value / reference[name] if reference[name] else 1.0
+            mark = '  РЕГРЕССИЯ' if ratio > 1 + tolerance else ''
+            if mark:
+                regressions.append((group, name, ratio))
+            print(f"{group:>8} {name:>24} {value:>11.3f} {reference[name]:>11.3f} {ratio:>10.2f}{mark}")
+    return regressions
+
+
+def print_report(report):
+    print(f"{'размер':>8} {'операция':>24} {'значение':>11}")
+    for group, values in report['results'].items():
+        for name, value in values.items():
+            print(f"{group:>8} {name:>24} {value:>11.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сводный бенчмарк магазина')
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)),
+                        help='размеры каталога через запятую')
+    parser.add_argument('--output', default='bench_results.json', help='куда записать результаты')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='эталон для сравнения')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='допустимое замедление')
+    parser.add_argument('--save-baseline', action='store_true', help='записать результаты как новый эталон')
+    args = parser.parse_args()
+
+    sizes = [int(float(size)) for size in args.sizes.split(',')]
+    report = run(sizes)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        print_report(report)
+        return 0
+    if not os.path.exists(args.baseline):
+        print_report(report)
+        print(f"Эталон {args.baseline} не найден, сравнение пропущено")
+        return 0
+    with open(args.baseline, encoding='utf-8') as file:
+        baseline = json.load(file)
+    regressions = compare(report, baseline, args.tolerance)
+    if regressions:
+        print(f"Регрессий: {len(regressions)} (допуск {args.tolerance:.0%})")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,28 @@
 # book.py
 # Импортируем необходимые модули
+import math
 from abc import ABC, abstractmethod
 from decorators import check_conditions, PreConditionError, PostConditionError
 
-# Абстрактный класс Product - базовый класс для всех продуктов в магазине
+# Проверка цены, общая для всех товаров (сеттеры price, импорт, массовая переоценка)
+def validate_price(value):
+    # bool - подкласс int, но True ценой не считается; inf и nan тоже не цены
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError("Цена должна быть числом")
+    if not math.isfinite(value):
+        raise ValueError(f"Цена должна быть конечным числом: {value}")
+    if value < 0:
+        raise ValueError("Цена не может быть отрицательной")
+    return value
+
+
+# Абстрактный класс Product - базовый класс для всех продуктов в магазине.
+# Товары хранят поля в __slots__ вместо __dict__: в каталоге на миллион позиций
+# словарь у каждого объекта занимает больше памяти, чем сами данные.
+# __weakref__ нужен для карты идентичности CatalogIndex
 class Product(ABC):
+    __slots__ = ('__weakref__',)
+
     @abstractmethod
     def __init__(self, title, author, price, genre):
         # Инициализация базовых атрибутов продукта
@@ -43,6 +61,8 @@ def price_was_set(result, self, title, author, price, genre, article=None):
 
 # Класс Book, наследующийся от Product - представляет книгу в магазине
 class Book(Product):
+    __slots__ = ('title', 'author', '_price', 'genre', 'article')
+
     # Декоратор для проверки условий при создании книги
     @check_conditions(pre_conditions=[is_valid_title], post_conditions=[price_was_set])
     def __init__(self, title, author, price, genre, article=None):
@@ -65,13 +85,11 @@ class Book(Product):
     @price.setter
     def price(self, value):
         # Сеттер для установки цены с проверками
-        if not isinstance(value, (int, float)):
-            raise ValueError("Цена должна быть числом")
-        if value < 0:
-            raise ValueError("Цена не может быть отрицательной")
-        self._price = value
+        self._price = validate_price(value)
 
 class Magazine(Product):
+    __slots__ = ('title', 'author', '_price', 'genre', 'article')
+
     def __init__(self, title, author, price, genre, article=None):
         super().__init__(title, author, price, genre)
         self._price = price
@@ -88,13 +106,11 @@ class Magazine(Product):
     @price.setter
     def price(self, value):
         # Сеттер для установки цены с проверками
-        if not isinstance(value, (int, float)):
-            raise ValueError("Цена должна быть числом")
-        if value < 0:
-            raise ValueError("Цена не может быть отрицательной")
-        self._price = value 
+        self._price = validate_price(value) 
 
 class Newspaper(Product):
+    __slots__ = ('title', 'publisher', '_price', 'date_published', 'genre', 'article')
+
     def __init__(self, title, publisher, price, date_published, article=None):
         self.title = title
         self.publisher = publisher
@@ -113,8 +129,4 @@ class Newspaper(Product):
 
     @price.setter
     def price(self, value):
-        if not isinstance(value, (int, float)):
-            raise ValueError("Цена должна быть числом")
-        if value < 0:
-            raise ValueError("Цена не может быть отрицательной")
-        self._price = value 
\ No newline at end of file
+        self._price = validate_price(value) 
\ No newline at end of file
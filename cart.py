@@ -0,0 +1,125 @@
+# cart.py
+# Корзина покупателя с количествами и поддерживаемой на лету общей суммой
+from itertools import islice
+
+
+# Проверки количества; библиотека вызывает их и до изменения корзины, чтобы не записать
+# в журнал операцию, которую корзина потом отклонит
+def check_positive(quantity):
+    if quantity <= 0:
+        raise ValueError("Количество должно быть положительным")
+
+
+def check_not_negative(quantity):
+    if quantity < 0:
+        raise ValueError("Количество не может быть отрицательным")
+
+
+# Строка корзины: товар, его категория, количество и цена за штуку
+class CartLine:
+    __slots__ = ('product', 'category', 'quantity', 'unit_price')
+
+    def __init__(self, product, category, quantity, unit_price):
+        self.product = product
+        self.category = category
+        self.quantity = quantity
+        self.unit_price = unit_price
+
+    @property
+    def subtotal(self):
+        return self.unit_price * self.quantity
+
+
+# Корзина: строки по артикулу (словарь сохраняет порядок добавления).
+# Сумма и число товаров пересчитываются по разнице при каждом изменении,
+# поэтому добавление, удаление и получение суммы работают за O(1) при любом размере корзины
+class Cart:
+    def __init__(self):
+        self._lines = {}
+        self.total = 0
+        self.items_count = 0
+
+    def __len__(self):
+        # Число строк (разных артикулов) в корзине
+        return len(self._lines)
+
+    def __bool__(self):
+        return bool(self._lines)
+
+    def __iter__(self):
+        return iter(list(self._lines.values()))
+
+    def __contains__(self, article):
+        return article in self._lines
+
+    def get(self, article):
+        return self._lines.get(article)
+
+    def page(self, offset=0, limit=None):
+        # Строки корзины с offset по offset + limit без копирования всей корзины
+        stop = None if limit is None else offset + limit
+        return list(islice(self._lines.values(), offset, stop))
+
+    def add(self, product, category, quantity=1):
+        # Повторное добавление артикула увеличивает количество, а не добавляет строку
+        check_positive(quantity)
+        line = self._lines.get(product.article)
+        if line is None:
+            line = self._lines[product.article] = CartLine(product, category, 0, product.price)
+        line.quantity += quantity
+        self.total += line.unit_price * quantity
+        self.items_count += quantity
+        return line
+
+    def remove(self, article, quantity=None):
+        # Убираем quantity штук артикула (None - всю строку); False, если артикула нет
+        if quantity is not None:
+            check_positive(quantity)
+        line = self._lines.get(article)
+        if line is None:
+            return False
+        if quantity is None or quantity >= line.quantity:
+            quantity = line.quantity
+        self._change(line, -quantity)
+        return True
+
+    def set_quantity(self, article, quantity):
+        # Устанавливаем количество артикула; 0 удаляет строку
+        check_not_negative(quantity)
+        line = self._lines.get(article)
+        if line is None:
+            return False
+        self._change(line, quantity - line.quantity)
+        return True
+
+    def reprice(self, product):
+        # Товар изменился (новый объект того же артикула) - берем его в строку
+        # и переносим разницу в цене в общую сумму
+        line = self._lines.get(product.article)
+        if line is None:
+            return False
+        line.product = product
+        new_price = product.price
+        self.total += (new_price - line.unit_price) * line.quantity
+        line.unit_price = new_price
+        self._settle()
+        return True
+
+    def clear(self):
+        self._lines.clear()
+        self.total = 0
+        self.items_count = 0
+
+    def _change(self, line, delta):
+        line.quantity += delta
+        self.total += line.unit_price * delta
+        self.items_count += delta
+        if line.quantity == 0:
+            del self._lines[line.product.article]
+        self._settle()
+
+    def _settle(self):
+        # В пустой корзине сумма ровно 0, без накопленной ошибки округления дробных цен
+        if not self._lines:
+            self.total = 0
+            self.items_count = 0
@@ -0,0 +1,170 @@
+# catalog.py
+# Колоночный каталог: компактное хранение большого числа товаров в памяти
+import sys
+from array import array
+from bisect import bisect_left
+
+from book import Book, Magazine, Newspaper, validate_price
+
+# NumPy необязателен: без него цены все равно лежат в компактном array('d')
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Коды категорий в колонке categories и классы, чье строковое представление повторяют строки
+CATEGORY_CODES = {'books': 0, 'magazines': 1, 'newspapers': 2}
+CATEGORY_NAMES = {code: name for name, code in CATEGORY_CODES.items()}
+CATEGORY_CLASSES = {0: Book, 1: Magazine, 2: Newspaper}
+
+
+# Легкое представление одной строки каталога.
+# Ведет себя как Book/Magazine/Newspaper (поля, __str__, свойство price с проверкой),
+# но хранит только ссылку на каталог и номер строки
+class ProductView:
+    __slots__ = ('_catalog', '_row')
+
+    def __init__(self, catalog, row):
+        self._catalog = catalog
+        self._row = row
+
+    @property
+    def article(self):
+        return self._catalog.articles[self._row]
+
+    @property
+    def category(self):
+        return CATEGORY_NAMES[self._catalog.categories[self._row]]
+
+    @property
+    def title(self):
+        return self._catalog.titles[self._row]
+
+    @property
+    def author(self):
+        return self._catalog.authors[self._row]
+
+    # У газет вместо автора - издатель
+    publisher = author
+
+    @property
+    def genre(self):
+        return self._catalog.genres[self._row]
+
+    @property
+    def date_published(self):
+        return self._catalog.dates[self._row]
+
+    @property
+    def _price(self):
+        # Цены хранятся как double; целые цены отдаем целыми, как в исходных объектах
+        value = self._catalog.prices[self._row]
+        return int(value) if value.is_integer() else value
+
+    @property
+    def price(self):
+        return self._price
+
+    @price.setter
+    def price(self, value):
+        # Та же проверка, что и в сеттерах Book/Magazine/Newspaper
+        self._catalog.prices[self._row] = validate_price(value)
+
+    def __str__(self):
+        # Берем форматирование у класса товара, чтобы строки совпадали
+        return CATEGORY_CLASSES[self._catalog.categories[self._row]].__str__(self)
+
+    def __eq__(self, other):
+        return isinstance(other, ProductView) and other._catalog is self._catalog and other._row == self._row
+
+    def __hash__(self):
+        return hash((id(self._catalog), self._row))
+
+
+# Колоночный каталог: числа в массивах array, строки в списках.
+# Повторяющиеся строки (авторы, жанры, даты) интернируются и хранятся в одном экземпляре;
+# названия почти всегда уникальны, поэтому их не интернируем. На товар приходятся
+# только элементы колонок, без отдельного объекта на каждую позицию
+class Catalog:
+    def __init__(self):
+        self.articles = array('q')
+        self.prices = array('d')
+        self.categories = array('b')
+        self.titles = []
+        self.authors = []
+        self.genres = []
+        self.dates = []
+        # Пока артикулы добавляются по возрастанию (как их отдает таблица products),
+        # строку ищем двоичным поиском по колонке articles без лишней памяти.
+        # Словарь артикул -> строка строится, только если порядок нарушен
+        self._rows = None
+
+    @classmethod
+    def from_rows(cls, rows):
+        # Строки в формате таблицы products:
+        # (артикул, категория, название, автор, цена, жанр, дата выпуска)
+        catalog = cls()
+        for row in rows:
+            catalog.append(*row)
+        return catalog
+
+    def __len__(self):
+        return len(self.articles)
+
+    def __contains__(self, article):
+        return self._find(article) is not None
+
+    def __iter__(self):
+        for row in range(len(self.articles)):
+            yield ProductView(self, row)
+
+    def __getitem__(self, row):
+        if not 0 <= row < len(self.articles):
+            raise IndexError(row)
+        return ProductView(self, row)
+
+    def append(self, article, category, title, author, price, genre, date_published=None):
+        # Добавляем строку (или заменяем строку с тем же артикулом)
+        validate_price(price)
+        row = self._find(article)
+        if row is not None:
+            self.prices[row] = price
+            self.categories[row] = CATEGORY_CODES[category]
+            self.titles[row] = title
+            self.authors[row] = sys.intern(author) if author is not None else None
+            self.genres[row] = sys.intern(genre) if genre is not None else None
+            self.dates[row] = sys.intern(date_published) if date_published is not None else None
+            return ProductView(self, row)
+        if self._rows is not None:
+            self._rows[article] = len(self.articles)
+        elif self.articles and article < self.articles[-1]:
+            self._rows = {value: index for index, value in enumerate(self.articles)}
+            self._rows[article] = len(self.articles)
+        self.articles.append(article)
+        self.prices.append(price)
+        self.categories.append(CATEGORY_CODES[category])
+        self.titles.append(title)
+        self.authors.append(sys.intern(author) if author is not None else None)
+        self.genres.append(sys.intern(genre) if genre is not None else None)
+        self.dates.append(sys.intern(date_published) if date_published is not None else None)
+        return ProductView(self, len(self.articles) - 1)
+
+    def _find(self, article):
+        # Номер строки по артикулу или None
+        if self._rows is not None:
+            return self._rows.get(article)
+        row = bisect_left(self.articles, article)
+        if row < len(self.articles) and self.articles[row] == article:
+            return row
+        return None
+
+    def get(self, article):
+        row = self._find(article)
+        return None if row is None else ProductView(self, row)
+
+    def prices_column(self):
+        # Колонка цен для векторных операций: массив NumPy без копирования, если NumPy есть.
+        # Пока такой массив жив, добавлять строки в каталог нельзя (array не может расшириться)
+        if np is not None:
+            return np.frombuffer(self.prices, dtype=np.float64)
+        return self.prices
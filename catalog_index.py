@@ -0,0 +1,190 @@
+# catalog_index.py
+# Индекс загруженных товаров каталога
+import threading
+import weakref
+
+# Версия индекса - трехуровневое дерево: артикул >> 14 -> (артикул >> 6) & 0xFF -> корзина
+# из 64 подряд идущих артикулов. Новая версия копирует только путь к измененным корзинам
+# (не больше 256 + 64 ссылок на корзину), а остальное дерево использует совместно
+# с прежней версией, поэтому публикация не дорожает с ростом каталога
+BUCKET_BITS = 6
+NODE_BITS = 8
+NODE_MASK = (1 << NODE_BITS) - 1
+# Сколько умерших ссылок копится, прежде чем publish вычистит их из всего дерева
+COMPACT_AFTER = 10000
+
+
+# Возвращает автора товара (у газет вместо автора - издатель)
+def product_author(product):
+    return getattr(product, 'author', getattr(product, 'publisher', 'Неизвестно'))
+
+
+# Одна версия карты идентичности: артикул -> слабая ссылка на объект товара.
+# После публикации версия не меняется, поэтому читатель, взявший ее, видит все товары
+# в одном согласованном состоянии, без блокировок и без наполовину примененных изменений
+class CatalogVersion:
+    __slots__ = ('number', '_root')
+
+    def __init__(self, number=0, root=None):
+        self.number = number
+        self._root = root or {}
+
+    def __len__(self):
+        return sum(1 for _, ref in self._refs() if ref() is not None)
+
+    def __contains__(self, article):
+        return self.get(article) is not None
+
+    def _refs(self):
+        for node in self._root.values():
+            for bucket in node.values():
+                yield from bucket.items()
+
+    def get(self, article):
+        node = self._root.get(article >> (BUCKET_BITS + NODE_BITS))
+        if node is None:
+            return None
+        bucket = node.get((article >> BUCKET_BITS) & NODE_MASK)
+        if bucket is None:
+            return None
+        ref = bucket.get(article)
+        return None if ref is None else ref()
+
+    def articles(self):
+        # Артикулы живых объектов этой версии
+        return [article for article, ref in self._refs() if ref() is not None]
+
+    def changed(self, changes, callback):
+        # Новая версия с изменениями {артикул: товар или None (убрать)}.
+        # Копируются корень, затронутые узлы и корзины; каждый - один раз на публикацию
+        root = dict(self._root)
+        nodes = {}
+        buckets = {}
+        for article, product in changes.items():
+            top = article >> (BUCKET_BITS + NODE_BITS)
+            key = (top, (article >> BUCKET_BITS) & NODE_MASK)
+            bucket = buckets.get(key)
+            if bucket is None:
+                node = nodes.get(top)
+                if node is None:
+                    node = nodes[top] = dict(root.get(top, ()))
+                bucket = buckets[key] = dict(node.get(key[1], ()))
+            if product is None:
+                bucket.pop(article, None)
+            else:
+                bucket[article] = weakref.ref(product, callback)
+        for (top, middle), bucket in buckets.items():
+            if bucket:
+                nodes[top][middle] = bucket
+            else:
+                nodes[top].pop(middle, None)
+        for top, node in nodes.items():
+            if node:
+                root[top] = node
+            else:
+                root.pop(top, None)
+        return CatalogVersion(self.number + 1, root)
+
+    def compacted(self):
+        # Та же версия без умерших ссылок
+        root = {}
+        for top, node in self._root.items():
+            for middle, bucket in node.items():
+                bucket = {article: ref for article, ref in bucket.items() if ref() is not None}
+                if bucket:
+                    root.setdefault(top, {})[middle] = bucket
+        return CatalogVersion(self.number, root)
+
+
+# Индекс опубликованных товаров: артикул -> объект товара
+# Сам каталог хранится в таблице products, а здесь лежат объекты, которые опубликовали
+# писатели (добавление, изменение, переоценка), чтобы читатели получали их, а не строили заново.
+# Объекты, построенные при чтении, в индекс не попадают: чтение ничего не публикует.
+# Ссылки слабые: объект уходит из индекса, как только на него никто не ссылается,
+# поэтому память не растет вместе с размером каталога.
+# Индекс версионный и копируется при записи: читатели берут текущую версию (snapshot)
+# одним чтением атрибута, без блокировки. Писатели под блокировкой строят новую версию
+# и публикуют ее целиком одним присваиванием. Опубликованные объекты товаров не изменяются:
+# изменение товара - это новый объект в новой версии
+class CatalogIndex:
+    def __init__(self):
+        self.current = CatalogVersion()
+        # Блокировка только для писателей: две публикации не должны потерять изменения друг друга
+        self._lock = threading.Lock()
+        self._dead = 0
+
+    def __len__(self):
+        return len(self.current)
+
+    def __contains__(self, article):
+        return article in self.current
+
+    def snapshot(self):
+        # Текущая версия индекса; она не изменится, сколько бы ее ни читали
+        return self.current
+
+    def articles(self):
+        return self.current.articles()
+
+    def get(self, article):
+        return self.current.get(article)
+
+    def replace(self, product):
+        # Заменяем объект товара (например, после add_product с тем же артикулом)
+        self.replace_many([product])
+        return product
+
+    def replace_many(self, products):
+        # Новые объекты товаров одной версией: читатели видят либо все замены, либо ни одной
+        with self._lock:
+            self._publish({product.article: product for product in products})
+
+    def update(self, articles, change):
+        # Новые объекты для уже загруженных товаров: change(товар) возвращает замену или None.
+        # Замены строятся без блокировки по текущей версии, а под блокировкой публикуются
+        # только те, чей товар с тех пор не заменили; для остальных change вызывается
+        # повторно по последней версии, поэтому параллельное изменение не потеряется.
+        # Возвращает замены
+        version = self.current
+        prepared = {}
+        for article in articles:
+            product = version.get(article)
+            if product is not None:
+                prepared[article] = (product, change(product))
+        with self._lock:
+            current = self.current
+            changes = {}
+            for article, (product, replacement) in prepared.items():
+                latest = current.get(article)
+                if latest is None:
+                    continue
+                if latest is not product:
+                    replacement = change(latest)
+                if replacement is not None:
+                    changes[article] = replacement
+            if changes:
+                self._publish(changes)
+        return list(changes.values())
+
+    def remove(self, article):
+        with self._lock:
+            product = self.current.get(article)
+            self._publish({article: None})
+        return product
+
+    def clear(self):
+        with self._lock:
+            self.current = CatalogVersion(self.current.number + 1)
+
+    def _publish(self, changes):
+        # Вызывается под self._lock
+        version = self.current
+        if self._dead >= COMPACT_AFTER:
+            self._dead = 0
+            version = version.compacted()
+        self.current = version.changed(changes, self._on_dead)
+
+    def _on_dead(self, ref):
+        # Объект товара удален сборщиком мусора; ссылку уберет замена того же артикула
+        # или общее сжатие (compacted). Счетчик приблизительный: обратный вызов идет без блокировки
+        self._dead += 1
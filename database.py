@@ -0,0 +1,88 @@
+# database.py
+# Открытие соединений с базой данных магазина
+import random
+from contextlib import contextmanager
+import sqlite3
+import threading
+import time
+
+# Повторы транзакции, если база занята другим соединением дольше busy_timeout
+RETRY_ATTEMPTS = 5
+# Начальная пауза между повторами (секунды), дальше она удваивается
+RETRY_DELAY = 0.01
+
+
+# Открываем соединение и настраиваем его под частые короткие записи:
+# - WAL: запись не блокирует чтение, а commit дописывает журнал вместо перезаписи страниц;
+# - synchronous=NORMAL: в режиме WAL fsync выполняется только при checkpoint,
+#   а не на каждый commit, при этом база не портится при сбое;
+# - busy_timeout: при занятой базе ждем, а не падаем сразу с "database is locked"
+def connect(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA foreign_keys=ON')
+    conn.execute('PRAGMA busy_timeout=5000')
+    return conn
+
+
+# Отдельное соединение на каждый поток.
+# Соединение sqlite3 нельзя использовать из другого потока, а WAL позволяет
+# нескольким соединениям читать параллельно, пока одно из них пишет
+class ThreadConnections:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def get(self):
+        # Соединение текущего потока, открывается при первом обращении
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = connect(self.db_path)
+        return conn
+
+    def close(self):
+        # Закрываем соединение текущего потока (соединения завершившихся потоков
+        # закрываются сами, когда threading.local удаляет их данные)
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# Ошибки SQLite, после которых транзакцию имеет смысл повторить
+def is_busy(error):
+    message = str(error)
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+
+# Выполняет work(cursor) в транзакции и возвращает ее результат.
+# BEGIN IMMEDIATE берет блокировку записи в начале, поэтому конфликт обнаруживается сразу,
+# а не посреди транзакции. Если база занята, транзакция откатывается и повторяется
+# с экспоненциально растущей случайной паузой, чтобы кассы не повторяли попытки одновременно
+def run_transaction(conn, work, attempts=RETRY_ATTEMPTS, delay=RETRY_DELAY):
+    for attempt in range(attempts):
+        try:
+            with conn:
+                cursor = conn.cursor()
+                cursor.execute('BEGIN IMMEDIATE')
+                return work(cursor)
+        except sqlite3.OperationalError as error:
+            if not is_busy(error) or attempt == attempts - 1:
+                raise
+        time.sleep(delay * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+# Несколько запросов чтения в одной транзакции: все они видят базу на один момент времени.
+# В режиме WAL читающая транзакция не блокирует писателей и не ждет их.
+# Если транзакция на соединении уже открыта, запросы идут в ней
+@contextmanager
+def read_transaction(conn):
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute('BEGIN')
+    try:
+        yield conn
+    finally:
+        conn.rollback()
@@ -1,44 +1,142 @@
 # decorators.py
 # Импортируем модуль time для измерения времени выполнения функций
+import itertools
+import os
 import time
+from functools import wraps
+from metrics import registry
+from profiling import profiler
 
 # Декоратор для логирования выполнения сценариев
-# Принимает название сценария и создает декоратор для функции
-def log_scenario(scenario_name):
+# Принимает название сценария и создает декоратор для функции.
+# Длительность каждого вызова попадает в metrics.registry (счетчики и перцентили),
+# а печать в консоль необязательна: echo=None берет общую настройку registry.echo
+def log_scenario(scenario_name, echo=None):
     def decorator(func):
+        # Гистограмму находим один раз при декорировании, а не на каждом вызове
+        histogram = registry.histogram(scenario_name)
+
+        @wraps(func)
         def wrapper(*args, **kwargs):
-            # Засекаем время начала выполнения
-            start_time = time.time()
-            # Выводим сообщение о начале сценария
-            print(f"Начало сценария: '{scenario_name}' - Функция: '{func.__name__}'")
-            # Выполняем саму функцию
-            result = func(*args, **kwargs)
-            # Засекаем время окончания
-            end_time = time.time()
+            printing = registry.echo if echo is None else echo
+            if printing:
+                # Выводим сообщение о начале сценария
+                print(f"Начало сценария: '{scenario_name}' - Функция: '{func.__name__}'")
+            # Засекаем время начала выполнения (perf_counter_ns - монотонный таймер высокого разрешения)
+            start_time = time.perf_counter_ns()
+            try:
+                # Выполняем саму функцию
+                result = func(*args, **kwargs)
+            except Exception:
+                # Вызовы, завершившиеся исключением, тоже учитываем
+                histogram.record(time.perf_counter_ns() - start_time, error=True)
+                raise
             # Вычисляем длительность выполнения
-            duration = end_time - start_time
-            # Выводим сообщение о завершении сценария
-            print(f"Окончание сценария: '{scenario_name}' - Функция: '{func.__name__}'. Длительность: {duration:.4f} сек.")
+            duration = time.perf_counter_ns() - start_time
+            histogram.record(duration)
+            if printing:
+                # Выводим сообщение о завершении сценария
+                print(f"Окончание сценария: '{scenario_name}' - Функция: '{func.__name__}'. Длительность: {duration / 1e9:.4f} сек.")
             return result
         return wrapper
     return decorator
 
 
-# Декоратор для проверки предусловий и постусловий функции
-def check_conditions(pre_conditions=None, post_conditions=None):
+# Обертка действий интерфейса (см. ActionRegistryMeta в app.py): число вызовов и распределение
+# задержек в metrics.registry под именем 'action:<действие>', без печати.
+# Если для действия включено профилирование (profiling.profiler.arm), вызов идет через cProfile
+def timed_action(action_name, func):
+    histogram = registry.histogram(f'action:{action_name}')
+    armed = profiler.armed
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start_time = time.perf_counter_ns()
+        try:
+            if armed:
+                result = profiler.call(action_name, func, args, kwargs)
+            else:
+                result = func(*args, **kwargs)
+        except Exception:
+            histogram.record(time.perf_counter_ns() - start_time, error=True)
+            raise
+        histogram.record(time.perf_counter_ns() - start_time)
+        return result
+    wrapper.action_name = action_name
+    return wrapper
+
+
+# Режимы проверки контрактов (пред- и постусловий):
+# 'always' - на каждом вызове, 'sampled' - на каждом N-м вызове,
+# 'off' - декоратор возвращает исходную функцию без обертки, то есть без накладных расходов
+CONTRACT_MODES = ('always', 'sampled', 'off')
+
+
+# Период выборочной проверки - целое число не меньше 1 (1 - проверять каждый вызов)
+def validate_sample_every(value, source='sample_every'):
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError(f"{source} должно быть целым числом не меньше 1: {value!r}")
+    return value
+
+
+# Период из STORE_CONTRACTS_SAMPLE; нечисловое значение - понятная ошибка, а не падение int()
+def _env_sample_every():
+    value = os.environ.get('STORE_CONTRACTS_SAMPLE', '100')
+    try:
+        number = int(value)
+    except ValueError:
+        number = value
+    return validate_sample_every(number, 'STORE_CONTRACTS_SAMPLE')
+
+
+# Общие настройки контрактов. Режим применяется в момент декорирования (при импорте модуля),
+# поэтому задавать его нужно до импорта: переменными окружения STORE_CONTRACTS и
+# STORE_CONTRACTS_SAMPLE или вызовом set_contract_mode
+contract_settings = {
+    'mode': os.environ.get('STORE_CONTRACTS', 'always'),
+    'sample_every': _env_sample_every()
+}
+
+
+# Меняет общий режим контрактов для функций, которые будут задекорированы после вызова
+def set_contract_mode(mode, sample_every=None):
+    if mode not in CONTRACT_MODES:
+        raise ValueError(f"Неизвестный режим контрактов: {mode}")
+    if sample_every is not None:
+        contract_settings['sample_every'] = validate_sample_every(sample_every)
+    contract_settings['mode'] = mode
+
+
+# Название условия для сообщения об ошибке
+def _condition_name(condition):
+    return condition.__name__ if hasattr(condition, '__name__') else condition
+
+
+# Декоратор для проверки предусловий и постусловий функции.
+# mode и sample_every переопределяют общие настройки contract_settings для этой функции
+def check_conditions(pre_conditions=None, post_conditions=None, mode=None, sample_every=None):
     # Инициализируем пустые списки, если условия не переданы
     if pre_conditions is None:
         pre_conditions = []
     if post_conditions is None:
         post_conditions = []
+    if sample_every is not None:
+        validate_sample_every(sample_every)
 
     def decorator(func):
-        def wrapper(*args, **kwargs):
+        current_mode = mode or contract_settings['mode']
+        if current_mode not in CONTRACT_MODES:
+            raise ValueError(f"Неизвестный режим контрактов: {current_mode}")
+        if current_mode == 'off':
+            # Проверки отключены - никакой обертки, вызывается сама функция
+            return func
+
+        def checked_call(*args, **kwargs):
             # Проверяем все предусловия перед выполнением функции
             for condition in pre_conditions:
                 if not condition(*args, **kwargs):
                     # Если предусловие не выполнено, вызываем исключение
-                    raise PreConditionError(f"Предусловие не выполнено для функции '{func.__name__}': {condition.__name__ if hasattr(condition, '__name__') else condition}")
+                    raise PreConditionError(f"Предусловие не выполнено для функции '{func.__name__}': {_condition_name(condition)}")
             
             # Выполняем основную функцию
             result = func(*args, **kwargs)
@@ -47,8 +145,21 @@ def check_conditions(pre_conditions=None, post_conditions=None):
             for condition in post_conditions:
                 if not condition(result, *args, **kwargs):
                     # Если постусловие не выполнено, вызываем исключение
-                    raise PostConditionError(f"Постусловие не выполнено для функции '{func.__name__}': {condition.__name__ if hasattr(condition, '__name__') else condition}")
+                    raise PostConditionError(f"Постусловие не выполнено для функции '{func.__name__}': {_condition_name(condition)}")
             return result
+
+        if current_mode == 'always':
+            return wraps(func)(checked_call)
+
+        # Режим 'sampled': проверяем первый вызов и далее каждый N-й
+        every = sample_every or contract_settings['sample_every']
+        calls = itertools.count()
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if next(calls) % every:
+                return func(*args, **kwargs)
+            return checked_call(*args, **kwargs)
         return wrapper
     return decorator
 
@@ -0,0 +1,217 @@
+# importer.py
+# Потоковый импорт и экспорт каталога в CSV и JSONL.
+# Файл читается генератором построчно, строки пишутся в таблицу products порциями
+# по одной транзакции на порцию, поэтому память не зависит от размера файла.
+# Запуск: python importer.py import feed.csv [--db store.db] [--chunk 5000] [--skip-invalid]
+#         python importer.py export catalog.jsonl [--db store.db] [--category books]
+import argparse
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from book import validate_price
+from library import Store, CATEGORIES, PRODUCT_COLUMNS, PRODUCT_UPSERT
+
+# Сколько строк записывать одной транзакцией
+CHUNK_SIZE = 5000
+FORMATS = ('csv', 'jsonl')
+FIELDS = tuple(PRODUCT_COLUMNS.split(', '))
+
+
+# Ошибка в строке файла импорта (номер строки в тексте сообщения)
+class ImportRowError(ValueError):
+    def __init__(self, line_number, message):
+        super().__init__(f"Строка {line_number}: {message}")
+        self.line_number = line_number
+
+
+# Итоги импорта или экспорта
+class TransferReport:
+    def __init__(self):
+        self.rows = 0
+        self.skipped = 0
+        self.chunks = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        text = f"{self.rows} строк за {self.seconds:.2f} сек. ({self.rows_per_second:,.0f} строк/сек.)"
+        if self.chunks:
+            text += f", порций: {self.chunks}, пропущено: {self.skipped}"
+        return text
+
+
+def detect_format(path, file_format=None):
+    file_format = file_format or os.path.splitext(path)[1].lstrip('.').lower()
+    if file_format not in FORMATS:
+        raise ValueError(f"Неизвестный формат файла: {path}")
+    return file_format
+
+
+# Генераторы записей файла: (номер строки, словарь полей).
+# Строки JSONL отдаются текстом: их разбирает parse_product, чтобы битая строка
+# была ошибкой этой строки (ImportRowError), а не всего файла
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as file:
+        reader = csv.DictReader(file)
+        for record in reader:
+            yield reader.line_num, record
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as file:
+        for line_number, line in enumerate(file, 1):
+            if line.strip():
+                yield line_number, line
+
+
+def read_records(path, file_format=None):
+    if detect_format(path, file_format) == 'csv':
+        return read_csv(path)
+    return read_jsonl(path)
+
+
+# В CSV все значения - строки, поэтому числа разбираем сами
+def parse_number(value):
+    if isinstance(value, str):
+        value = value.strip()
+        try:
+            return int(value)
+        except ValueError:
+            try:
+                return float(value)
+            except ValueError:
+                return value
+    return value
+
+
+def parse_article(value):
+    # Артикул - целое число; дробный артикул (501.9) не округляем, а отклоняем
+    value = parse_number(value)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"артикул должен быть целым числом: {value!r}")
+    return value
+
+
+def parse_product(line_number, record):
+    # Проверяем запись по тем же правилам, что и классы товаров, и возвращаем строку таблицы products
+    if isinstance(record, str):
+        try:
+            record = json.loads(record)
+        except ValueError as error:
+            raise ImportRowError(line_number, f"некорректный JSON: {error}") from None
+        if not isinstance(record, dict):
+            raise ImportRowError(line_number, "запись должна быть объектом JSON")
+    try:
+        article = parse_article(record['article'])
+        category = record['category']
+        title = record['title']
+        price = validate_price(parse_number(record['price']))
+    except KeyError as error:
+        raise ImportRowError(line_number, f"нет поля {error}") from None
+    except (TypeError, ValueError) as error:
+        raise ImportRowError(line_number, error) from None
+    if category not in CATEGORIES:
+        raise ImportRowError(line_number, f"неизвестная категория {category!r}")
+    if not isinstance(title, str) or not title:
+        raise ImportRowError(line_number, "пустое название")
+    # У газет в файле может быть издатель вместо автора; жанр у газет всегда "Газета"
+    author = record.get('author') or record.get('publisher') or None
+    if category == 'newspapers':
+        genre = 'Газета'
+    else:
+        genre = record.get('genre') or None
+    date_published = record.get('date_published') or None
+    return article, category, title, author, price, genre, date_published
+
+
+def valid_rows(records, report, skip_invalid=False):
+    for line_number, record in records:
+        try:
+            yield parse_product(line_number, record)
+        except ImportRowError:
+            if not skip_invalid:
+                raise
+            report.skipped += 1
+
+
+def import_products(store, path, file_format=None, chunk_size=CHUNK_SIZE, skip_invalid=False):
+    # Загружаем файл в каталог магазина. Каждая порция - отдельная транзакция:
+    # при ошибке в строке уже записанные порции остаются, текущая откатывается
+    report = TransferReport()
+    rows = valid_rows(read_records(path, file_format), report, skip_invalid)
+    conn = store.conn
+    start = time.perf_counter()
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            with conn:
+                conn.executemany(PRODUCT_UPSERT, chunk)
+            store.refresh_products(chunk)
+            report.rows += len(chunk)
+            report.chunks += 1
+    finally:
+        report.seconds = time.perf_counter() - start
+        # Поисковый индекс проще построить заново один раз, чем обновлять на каждой строке
+        if report.rows and store.search_index is not None:
+            store.build_search_index()
+    store.log_db_action("UPSERT", "products", "%s rows from %s", report.rows, os.path.basename(path))
+    return report
+
+
+def export_products(store, path, file_format=None, category=None):
+    # Выгружаем каталог курсором: строки идут из базы в файл без списка в памяти
+    file_format = detect_format(path, file_format)
+    report = TransferReport()
+    query = f'SELECT {PRODUCT_COLUMNS} FROM products'
+    params = ()
+    if category:
+        query += ' WHERE category = ?'
+        params = (category,)
+    start = time.perf_counter()
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        if file_format == 'csv':
+            writer = csv.writer(file)
+            writer.writerow(FIELDS)
+            write = writer.writerow
+        else:
+            def write(row):
+                file.write(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False))
+                file.write('\n')
+        for row in store.conn.execute(query + ' ORDER BY article', params):
+            write(row)
+            report.rows += 1
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Импорт и экспорт каталога магазина')
+    parser.add_argument('command', choices=('import', 'export'))
+    parser.add_argument('path', help='файл .csv или .jsonl')
+    parser.add_argument('--db', default='store.db', help='файл базы данных магазина')
+    parser.add_argument('--format', choices=FORMATS, help='формат, если его не видно по расширению')
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE, help='строк в одной транзакции')
+    parser.add_argument('--category', choices=tuple(CATEGORIES), help='выгрузить только одну категорию')
+    parser.add_argument('--skip-invalid', action='store_true', help='пропускать ошибочные строки')
+    args = parser.parse_args()
+
+    store = Store(args.db)
+    if args.command == 'import':
+        report = import_products(store, args.path, args.format, args.chunk, args.skip_invalid)
+    else:
+        report = export_products(store, args.path, args.format, args.category)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# journal.py
+# Журнал корзин: каждое изменение корзины дописывается в таблицу cart_journal,
+# поэтому открытые корзины переживают падение или перезапуск кассы.
+# Запись на операцию - одна строка (O(1) при любом размере корзины); журнал сессии
+# периодически сжимается до снимка ее корзины, а при запуске Store проигрывается заново
+import threading
+
+JOURNAL_TABLE = '''CREATE TABLE IF NOT EXISTS cart_journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    op TEXT NOT NULL,
+    article INTEGER,
+    quantity INTEGER
+)'''
+
+# Операции журнала: add - добавить quantity штук, remove - убрать quantity штук
+# (NULL - всю строку), set - установить количество
+ADD, REMOVE, SET = 'add', 'remove', 'set'
+# Записи корзины, забранной для фоновой записи заказа, хранятся под ключом "сессия#отметка"
+HELD_SEPARATOR = '#'
+# Журнал сессии сжимается, когда в нем больше записей, чем max(COMPACT_MIN, 2 * строк корзины)
+COMPACT_MIN = 1000
+
+
+class CartJournal:
+    def __init__(self, connections, compact_min=COMPACT_MIN):
+        # connections - соединения магазина по потокам (database.ThreadConnections)
+        self.connections = connections
+        self.compact_min = compact_min
+        # Сколько записей накоплено в журнале каждой сессии
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def create_table(self, cursor):
+        cursor.execute(JOURNAL_TABLE)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_cart_journal_session ON cart_journal (session_id, id)')
+
+    def append(self, session_id, op, article, quantity=None):
+        # Одна строка и один commit на операцию; вызывается под блокировкой сессии,
+        # поэтому порядок записей сессии совпадает с порядком изменений корзины
+        conn = self.connections.get()
+        with conn:
+            conn.execute('INSERT INTO cart_journal (session_id, op, article, quantity) VALUES (?, ?, ?, ?)',
+                         (session_id, op, article, quantity))
+        with self._lock:
+            count = self._counts[session_id] = self._counts.get(session_id, 0) + 1
+        return count
+
+    def needs_compaction(self, session_id, cart_lines):
+        return self._counts.get(session_id, 0) > max(self.compact_min, 2 * cart_lines)
+
+    def compact(self, session_id, cart, cursor=None):
+        # Заменяем журнал сессии снимком корзины: по записи add на строку.
+        # С cursor запись идет в транзакции вызывающего кода (например, вместе с заказом)
+        rows = [(session_id, ADD, line.product.article, line.quantity) for line in cart]
+        if cursor is None:
+            conn = self.connections.get()
+            with conn:
+                self._rewrite(conn.cursor(), session_id, rows)
+        else:
+            self._rewrite(cursor, session_id, rows)
+        with self._lock:
+            self._counts[session_id] = len(rows)
+
+    def discard(self, session_id, cursor=None):
+        # Корзина очищена или сессия закрыта: журнал сессии больше не нужен
+        self.compact(session_id, (), cursor)
+
+    def hold(self, session_id):
+        # Корзину забрали для фоновой записи заказа (Store.take_cart): ее записи переходят
+        # под отдельный ключ и остаются в журнале, пока заказ не записан (settle).
+        # Новые изменения корзины сессии пишутся уже отдельно от них.
+        # Возвращает ключ записей забранной корзины
+        conn = self.connections.get()
+        with conn:
+            mark = conn.execute('SELECT COALESCE(MAX(id), 0) FROM cart_journal WHERE session_id = ?',
+                                (session_id,)).fetchone()[0]
+            key = f'{session_id}{HELD_SEPARATOR}{mark}'
+            conn.execute('UPDATE cart_journal SET session_id = ? WHERE session_id = ?', (key, session_id))
+        with self._lock:
+            self._counts[session_id] = 0
+        return key
+
+    def settle(self, key, cursor):
+        # Заказ забранной корзины записывается в транзакции cursor - удаляем ее записи там же
+        cursor.execute('DELETE FROM cart_journal WHERE session_id = ?', (key,))
+
+    @staticmethod
+    def _rewrite(cursor, session_id, rows):
+        cursor.execute('DELETE FROM cart_journal WHERE session_id = ?', (session_id,))
+        cursor.executemany('INSERT INTO cart_journal (session_id, op, article, quantity) VALUES (?, ?, ?, ?)', rows)
+
+    def events(self):
+        # Все записи журнала в порядке записи: (сессия, операция, артикул, количество)
+        return self.connections.get().execute(
+            'SELECT session_id, op, article, quantity FROM cart_journal ORDER BY id')
@@ -1,134 +1,701 @@
 # library.py
 # Импортируем необходимые модули
-import sqlite3
+import copy
+import logging
+import threading
 import time
+from datetime import datetime
 from book import Book, Magazine, Newspaper
+from catalog import Catalog
+from catalog_index import CatalogIndex, product_author
+import reports
+from database import ThreadConnections, read_transaction, run_transaction
+from cart import Cart, check_not_negative, check_positive
+from journal import CartJournal, ADD, REMOVE, SET, HELD_SEPARATOR
+from search import SearchIndex
+from sessions import DEFAULT_SESSION, SessionManager
+from pricing import new_prices
+from stock import StockCache, reserve_stock, validate_stock
 from decorators import log_scenario
+from logs import get_logger
+
+db_logger = get_logger('db')
 
 # Миксин для логирования операций с базой данных
 class DatabaseLoggingMixin:
-    def log_db_action(self, action, table_name, data=None):
-        # Формируем сообщение о действии с базой данных
-        log_message = f"Database Action: {action} on table '{table_name}'"
-        if data:
-            log_message += f" with data: {data}"
-        print(log_message)
+    def log_db_action(self, action, table_name, data=None, *args, level=logging.INFO):
+        # Сообщение о действии с базой данных уходит в очередь журнала (см. logs.py).
+        # Строка собирается в потоке записи и только если уровень включен, поэтому
+        # data лучше передавать шаблоном с аргументами: log_db_action("INSERT", "orders", "order #%s", order_id)
+        if not data:
+            db_logger.log(level, "Database Action: %s on table '%s'", action, table_name)
+        elif args:
+            db_logger.log(level, "Database Action: %s on table '%s' with data: " + data, action, table_name, *args)
+        else:
+            db_logger.log(level, "Database Action: %s on table '%s' with data: %s", action, table_name, data)
+
+
+# Категории каталога и классы товаров, которые в них лежат
+CATEGORIES = {
+    'books': Book,
+    'magazines': Magazine,
+    'newspapers': Newspaper
+}
+
+# Начальный каталог: (артикул, категория, название, автор/издатель, цена, жанр, дата выпуска)
+# Книги с артикулами до 50, журналы больше 50, газеты больше 80
+DEFAULT_PRODUCTS = [
+    (10, 'books', 'Война и мир', 'Лев Толстой', 500, 'Роман', None),
+    (11, 'books', 'Мастер и Маргарита', 'Михаил Булгаков', 400, 'Фантастика', None),
+    (12, 'books', 'Преступление и наказание', 'Федор Достоевский', 350, 'Классика', None),
+    (13, 'books', 'Анна Каренина', 'Лев Толстой', 450, 'Роман', None),
+    (14, 'books', 'Идиот', 'Федор Достоевский', 320, 'Классика', None),
+    (51, 'magazines', 'Time', 'Time Inc.', 100, 'Политика', None),
+    (52, 'magazines', 'National Geographic', 'National Geographic Society', 200, 'Наука', None),
+    (53, 'magazines', 'Vogue', 'Condé Nast', 250, 'Мода', None),
+    (54, 'magazines', 'Forbes', 'Forbes Media', 180, 'Бизнес', None),
+    (55, 'magazines', 'Cosmopolitan', 'Hearst Communications', 150, 'Стиль жизни', None),
+    (81, 'newspapers', 'Ведомости', 'Business News Media', 50, 'Газета', '2024-03-20'),
+    (82, 'newspapers', 'Коммерсантъ', 'Коммерсантъ', 60, 'Газета', '2024-03-20'),
+    (83, 'newspapers', 'РБК', 'РБК Медиа', 55, 'Газета', '2024-03-20')
+]
+
+# Колонки таблицы products в порядке, в котором их читает _build_product
+PRODUCT_COLUMNS = 'article, category, title, author, price, genre, date_published'
+
+# Вставка или обновление товара по артикулу. В отличие от INSERT OR REPLACE
+# строка не удаляется, поэтому остаток (stock) сохраняется
+PRODUCT_UPSERT = f'''INSERT INTO products ({PRODUCT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(article) DO UPDATE SET
+        category = excluded.category, title = excluded.title, author = excluded.author,
+        price = excluded.price, genre = excluded.genre, date_published = excluded.date_published'''
+
+
+# Возвращает категорию товара по его классу
+def product_category(product):
+    for category, product_class in CATEGORIES.items():
+        if isinstance(product, product_class):
+            return category
+    # Строки колоночного каталога (catalog.ProductView) знают свою категорию сами
+    if getattr(product, 'category', None) in CATEGORIES:
+        return product.category
+    raise ValueError(f"Неизвестный тип товара: {type(product).__name__}")
+
+
+# Копия товара с измененными полями. Опубликованные в CatalogIndex объекты не изменяются,
+# поэтому изменение товара - это новый объект; поля копии проходят через ее сеттеры
+def revise(product, **changes):
+    product = copy.copy(product)
+    for field, value in changes.items():
+        setattr(product, field, value)
+    return product
+
+
+# Преобразует товар в строку таблицы products
+def product_row(product, category=None):
+    return (
+        product.article,
+        category or product_category(product),
+        product.title,
+        product_author(product),
+        product.price,
+        product.genre,
+        getattr(product, 'date_published', None)
+    )
+
+
+# Совпадает ли объект товара со строкой таблицы products.
+# Сравниваются только поля, которые объект хранит: у газет нет своего жанра, у книг и журналов - даты
+def matches_row(product, row):
+    article, category, title, author, price, genre, date_published = row
+    if not isinstance(product, CATEGORIES[category]) or product.title != title or product._price != price:
+        return False
+    if category == 'newspapers':
+        return product.publisher == author and product.date_published == date_published
+    return product.author == author and product.genre == genre
+
+
+# Заголовок заказа: одна строка на оформление корзины.
+# created_at пустой только у заказов, перенесенных из старой схемы
+ORDERS_TABLE = '''CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT,
+    total NUMERIC NOT NULL,
+    items_count INTEGER NOT NULL
+)'''
+
+# Строки заказа, сгруппированные по order_id
+ORDER_ITEMS_TABLE = '''CREATE TABLE IF NOT EXISTS order_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INTEGER NOT NULL REFERENCES orders (id) ON DELETE CASCADE,
+    article INTEGER,
+    product_title TEXT,
+    author TEXT,
+    price NUMERIC NOT NULL,
+    genre TEXT,
+    quantity INTEGER NOT NULL DEFAULT 1
+)'''
+
+
+# Строка заказа: (артикул, название, автор, цена, жанр, количество)
+def order_line(product, quantity=1, price=None):
+    # Для газет вместо author используется publisher
+    if price is None:
+        price = product.price
+    return (product.article, product.title, product_author(product), price, product.genre, quantity)
+
+
+# Строки заказа для содержимого корзины (строк cart.CartLine)
+def cart_order_lines(lines):
+    return [order_line(line.product, line.quantity, line.unit_price) for line in lines]
+
+
+# Записывает заказ (заголовок и строки) через переданный курсор и возвращает номер заказа.
+# Транзакцией управляет вызывающий код, поэтому несколько заказов можно записать одним commit
+def insert_order(cursor, lines, created_at=None):
+    # Сначала списываем остатки: если товара не хватает, OutOfStockError откатит всю транзакцию
+    reserve_stock(cursor, lines)
+    created_at = created_at or datetime.now().isoformat(sep=' ', timespec='seconds')
+    total = sum(line[3] * line[5] for line in lines)
+    cursor.execute('INSERT INTO orders (created_at, total, items_count) VALUES (?, ?, ?)',
+                   (created_at, total, sum(line[5] for line in lines)))
+    order_id = cursor.lastrowid
+    cursor.executemany('''INSERT INTO order_items (order_id, article, product_title, author, price, genre, quantity)
+                          VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                       [(order_id,) + line for line in lines])
+    # Сводки продаж обновляются в той же транзакции, что и сам заказ
+    reports.record_sales(cursor, lines, created_at)
+    return order_id
 
 
 # Основной класс магазина, включающий функционал логирования БД
 class Store(DatabaseLoggingMixin):
-    def __init__(self):
-        self.products = {
-            'books': [],
-            'magazines': [],
-            'newspapers': []
-        }
-        self.cart = []
-        self.conn = sqlite3.connect('store.db')
-        self.cursor = self.conn.cursor()
+    def __init__(self, db_path='store.db'):
+        # Каталог хранится в таблице products, в памяти только уже созданные объекты
+        self.index = CatalogIndex()
+        # Поисковый индекс по названиям и авторам строится по требованию (см. build_search_index)
+        self.search_index = None
+        self._search_lock = threading.Lock()
+        # Корзины покупателей по сессиям; одна сессия - одна касса
+        self.sessions = SessionManager()
+        self.db_path = db_path
+        # У каждого потока свое соединение в режиме WAL (см. database.connect)
+        self.connections = ThreadConnections(db_path)
+        # Журнал изменений корзин в той же базе (см. journal.py)
+        self.journal = CartJournal(self.connections)
+        # Кэш остатков, который сбрасывается при изменениях базы (см. stock.py)
+        self.stock = StockCache(self.connections)
         self.create_tables()
         self.load_products()
+        # Восстанавливаем корзины, открытые до перезапуска
+        self.restore_carts()
+
+    @property
+    def conn(self):
+        # Соединение текущего потока
+        return self.connections.get()
+
+    @property
+    def cart(self):
+        # Корзина сессии по умолчанию (для однооконного приложения)
+        return self.sessions.get(DEFAULT_SESSION).cart
+
+    def open_session(self):
+        # Новая сессия покупателя, возвращает ее идентификатор
+        return self.sessions.open()
+
+    def close_session(self, session_id):
+        self.journal.discard(session_id)
+        return self.sessions.close(session_id)
+
+    def _journal(self, session, op, article, quantity, change):
+        # Записываем операцию с корзиной в журнал и только после ее commit меняем корзину
+        # (change; вызывается под блокировкой сессии): если запись не удалась, корзина в памяти
+        # остается прежней и не расходится с журналом.
+        # Журнал сессии сжимается, когда он заметно длиннее самой корзины
+        self.journal.append(session.session_id, op, article, quantity)
+        result = change()
+        if self.journal.needs_compaction(session.session_id, len(session.cart)):
+            self.journal.compact(session.session_id, session.cart)
+        return result
+
+    def restore_carts(self):
+        # Проигрываем журнал корзин по порядку записей, а затем сжимаем журнал каждой сессии,
+        # чтобы следующий запуск читал только снимок корзин.
+        # Корзины, забранные для заказов, которые не успели записать (ключ "сессия#отметка"),
+        # проигрываются отдельно и возвращаются в корзину своей сессии
+        restored = set()
+        carts = {}
+        held = {}
+        for key, op, article, quantity in self.journal.events():
+            cart = carts.get(key)
+            if cart is None:
+                session_id, _, mark = key.partition(HELD_SEPARATOR)
+                if mark:
+                    cart = carts[key] = Cart()
+                    held.setdefault(session_id, []).append(key)
+                else:
+                    self.sessions.open(session_id)
+                    cart = carts[key] = self.sessions.get(session_id).cart
+                restored.add(session_id)
+            if op == ADD:
+                product = self.get_by_article(article)
+                # Товар могли удалить из каталога, пока касса была выключена
+                if product is not None:
+                    cart.add(product, product_category(product), quantity)
+            elif op == REMOVE:
+                cart.remove(article, quantity)
+            elif op == SET:
+                cart.set_quantity(article, quantity)
+        conn = self.conn
+        for session_id in restored:
+            self.sessions.open(session_id)
+            session = self.sessions.get(session_id)
+            with session.lock:
+                for key in held.get(session_id, ()):
+                    for line in carts[key]:
+                        session.cart.add(line.product, line.category, line.quantity)
+                with conn:
+                    cursor = conn.cursor()
+                    self.journal.compact(session_id, session.cart, cursor)
+                    for key in held.get(session_id, ()):
+                        self.journal.settle(key, cursor)
+        if restored:
+            self.log_db_action("REPLAY", "cart_journal", "%s carts", len(restored))
 
     @log_scenario("Создание таблиц БД")
     def create_tables(self):
+        # Старая таблица orders хранила по строке на товар - переносим ее в новую схему
+        self.migrate_legacy_orders()
         # Логируем создание таблицы
         self.log_db_action("CREATE TABLE IF NOT EXISTS", "orders")
-        # Создаем таблицу для заказов если она не существует
-        self.cursor.execute('''CREATE TABLE IF NOT EXISTS orders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            product_title TEXT,
+        self.conn.execute(ORDERS_TABLE)
+        self.log_db_action("CREATE TABLE IF NOT EXISTS", "order_items")
+        self.conn.execute(ORDER_ITEMS_TABLE)
+        self.conn.execute('''CREATE INDEX IF NOT EXISTS idx_order_items_order
+            ON order_items (order_id)''')
+        self.log_db_action("CREATE TABLE IF NOT EXISTS", "products")
+        # Артикул - первичный ключ (он же rowid), поэтому поиск по нему уже индексирован.
+        # NUMERIC сохраняет целые цены целыми, а дробные - дробными
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS products (
+            article INTEGER PRIMARY KEY,
+            category TEXT NOT NULL,
+            title TEXT NOT NULL,
             author TEXT,
-            price REAL,
-            genre TEXT
+            price NUMERIC NOT NULL,
+            genre TEXT,
+            date_published TEXT,
+            stock INTEGER CHECK (stock IS NULL OR stock >= 0)
         )''')
+        # Остатки появились позже остальных колонок - добавляем колонку в старые базы
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(products)')]
+        if 'stock' not in columns:
+            self.log_db_action("ALTER TABLE ADD COLUMN stock", "products")
+            self.conn.execute('ALTER TABLE products ADD COLUMN stock INTEGER CHECK (stock IS NULL OR stock >= 0)')
+        # Частичный индекс: только товары, у которых ведется остаток
+        self.conn.execute('''CREATE INDEX IF NOT EXISTS idx_products_stocked
+            ON products (article) WHERE stock IS NOT NULL''')
+        # Индекс (category, article) отдает страницы категории уже отсортированными
+        self.conn.execute('''CREATE INDEX IF NOT EXISTS idx_products_category
+            ON products (category, article)''')
+        self.conn.execute('''CREATE INDEX IF NOT EXISTS idx_products_genre
+            ON products (genre, article)''')
+        self.conn.execute('''CREATE INDEX IF NOT EXISTS idx_products_author
+            ON products (author, article)''')
+        # Сводные таблицы продаж и индекс заказов по времени (см. reports.py)
+        reports.create_report_tables(self.conn.cursor())
+        self.journal.create_table(self.conn.cursor())
         self.conn.commit()
+        # Заказы, записанные до появления сводок, учитываем один раз
+        if reports.backfill(self.conn):
+            self.log_db_action("BACKFILL", "sales summaries")
+
+    def migrate_legacy_orders(self):
+        # Старая схема: orders (id, product_title или book_title, author, price, genre).
+        # Каждая старая строка становится отдельным заказом с неизвестной датой
+        cursor = self.conn.cursor()
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(orders)')]
+        if 'price' not in columns:
+            return
+        title_column = 'product_title' if 'product_title' in columns else 'book_title'
+        self.log_db_action("MIGRATE", "orders")
+        # Переносим все строки одной транзакцией: либо миграция целиком, либо ничего
+        with self.conn:
+            cursor.execute('BEGIN')
+            cursor.execute('ALTER TABLE orders RENAME TO orders_legacy')
+            cursor.execute(ORDERS_TABLE)
+            cursor.execute(ORDER_ITEMS_TABLE)
+            cursor.execute('''INSERT INTO orders (id, created_at, total, items_count)
+                                   SELECT id, NULL, COALESCE(price, 0), 1 FROM orders_legacy''')
+            cursor.execute(f'''INSERT INTO order_items (order_id, product_title, author, price, genre)
+                                    SELECT id, {title_column}, author, COALESCE(price, 0), genre FROM orders_legacy''')
+            cursor.execute('DROP TABLE orders_legacy')
 
     def load_products(self):
-        # Загружаем книги с артикулами до 50
-        self.products['books'] = [
-            Book('Война и мир', 'Лев Толстой', 500, 'Роман', 10),
-            Book('Мастер и Маргарита', 'Михаил Булгаков', 400, 'Фантастика', 11),
-            Book('Преступление и наказание', 'Федор Достоевский', 350, 'Классика', 12),
-            Book('Анна Каренина', 'Лев Толстой', 450, 'Роман', 13),
-            Book('Идиот', 'Федор Достоевский', 320, 'Классика', 14)
-        ]
-        
-        # Загружаем журналы с артикулами больше 50
-        self.products['magazines'] = [
-            Magazine('Time', 'Time Inc.', 100, 'Политика', 51),
-            Magazine('National Geographic', 'National Geographic Society', 200, 'Наука', 52),
-            Magazine('Vogue', 'Condé Nast', 250, 'Мода', 53),
-            Magazine('Forbes', 'Forbes Media', 180, 'Бизнес', 54),
-            Magazine('Cosmopolitan', 'Hearst Communications', 150, 'Стиль жизни', 55)
-        ]
-        
-        # Загружаем газеты с артикулами больше 80
-        self.products['newspapers'] = [
-            Newspaper('Ведомости', 'Business News Media', 50, '2024-03-20', 81),
-            Newspaper('Коммерсантъ', 'Коммерсантъ', 60, '2024-03-20', 82),
-            Newspaper('РБК', 'РБК Медиа', 55, '2024-03-20', 83)
-        ]
-
-    def list_products(self, category=None):
+        # Заполняем пустой каталог начальным набором товаров.
+        # Объекты товаров при этом не создаются - они строятся по мере чтения страниц
+        if self.conn.execute('SELECT 1 FROM products LIMIT 1').fetchone():
+            return
+        self.log_db_action("INSERT", "products", "%s rows", len(DEFAULT_PRODUCTS))
+        self.conn.executemany(f'INSERT INTO products ({PRODUCT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                DEFAULT_PRODUCTS)
+        self.conn.commit()
+
+    @staticmethod
+    def _build_product(row):
+        # Новый объект товара по строке таблицы
+        article, category, title, author, price, genre, date_published = row
+        if category == 'newspapers':
+            return Newspaper(title, author, price, date_published, article)
+        return CATEGORIES[category](title, author, price, genre, article)
+
+    def _resolve(self, rows, snapshot):
+        # Объекты товаров для строк таблицы: опубликованные писателями берем из одной версии
+        # индекса, снятой до запроса, остальные строим по строкам. Чтение ничего не публикует
+        # и не берет блокировок. Если строка отличается от опубликованного объекта (товар изменен,
+        # а писатель еще не опубликовал новую версию), объект тоже строится по строке:
+        # страница всегда совпадает с тем, что вернула база
+        products = []
+        for row in rows:
+            product = snapshot.get(row[0])
+            if product is None or not matches_row(product, row):
+                product = self._build_product(row)
+            products.append(product)
+        return products
+
+    def _query_products(self, where, params):
+        # Строим объекты только для строк, которые вернул курсор.
+        # Версию индекса берем до запроса: все, что опубликовано позже, строки уже учитывают
+        snapshot = self.index.snapshot()
+        query = f'SELECT {PRODUCT_COLUMNS} FROM products WHERE {where}'
+        return self._resolve(self.conn.execute(query, params).fetchall(), snapshot)
+
+    def add_product(self, product, category=None):
+        # Добавляем товар в каталог (или заменяем товар с тем же артикулом)
+        category = category or product_category(product)
+        if not isinstance(product, CATEGORIES.get(category, ())):
+            raise ValueError(f"Товар не подходит для категории: {category}")
+        self.conn.execute(PRODUCT_UPSERT, product_row(product, category))
+        self.conn.commit()
+        self.index.replace(product)
+        self._update_search_index(product.article, product)
+
+    def remove_product(self, article):
+        # Удаляем товар из каталога и индекса загруженных объектов
+        conn = self.conn
+        cursor = conn.execute('DELETE FROM products WHERE article = ?', (article,))
+        conn.commit()
+        self.index.remove(article)
+        self._update_search_index(article, None)
+        return cursor.rowcount > 0
+
+    def update_product(self, article, **changes):
+        # Изменяем поля товара (название, автор, цена, жанр) в таблице и публикуем новый объект.
+        # Значения проходят через сеттеры копии товара, поэтому цена проверяется как обычно,
+        # а опубликованный объект, который могут читать другие потоки, не меняется
+        product = self.get_by_article(article)
+        if product is None:
+            return False
+        product = revise(product, **changes)
+        row = product_row(product)
+        self.conn.execute('''UPDATE products SET title = ?, author = ?, price = ?, genre = ?, date_published = ?
+                               WHERE article = ?''', row[2:] + (article,))
+        self.conn.commit()
+        self.index.replace(product)
+        if 'title' in changes or 'author' in changes or 'publisher' in changes:
+            self._update_search_index(article, product)
+        self.reprice_carts({article}, lambda line_product: product)
+        return True
+
+    @log_scenario("Массовая переоценка")
+    def reprice(self, percent=0, amount=0, category=None, genre=None, author=None, articles=None):
+        # Меняем цены всех товаров под фильтром: на percent процентов и/или на amount рублей.
+        # Фильтры: категория, жанр, автор (издатель), диапазон артикулов articles=(первый, последний).
+        # Новые цены считаются и проверяются пакетом (pricing.new_prices); если хоть одна
+        # не проходит проверку, не меняется ничего. Таблица обновляется одной транзакцией,
+        # а загруженные объекты и корзины - только после ее успешного commit.
+        # Возвращает число переоцененных товаров
+        conditions = []
+        params = []
+        for column, value in (('category', category), ('genre', genre), ('author', author)):
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        if articles is not None:
+            conditions.append('article BETWEEN ? AND ?')
+            params.extend(articles)
+        where = ' AND '.join(conditions) or '1'
+        conn = self.conn
+        with conn:
+            # BEGIN IMMEDIATE сразу берет блокировку записи: цены не изменятся между чтением и записью
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute(f'SELECT article, price FROM products WHERE {where}', params).fetchall()
+            if not rows:
+                return 0
+            articles_list = [row[0] for row in rows]
+            prices = new_prices(articles_list, [row[1] for row in rows], percent, amount)
+            conn.executemany('UPDATE products SET price = ? WHERE article = ?', zip(prices, articles_list))
+        # Опубликованные товары получают новые цены одной версией индекса: читатель видит
+        # либо все старые цены, либо все новые. Цены уже проверены пакетом, поэтому копии
+        # получают их мимо сеттеров. Опубликованных объектов обычно намного меньше,
+        # чем переоцененных строк - перебираем их
+        changes = dict(zip(articles_list, prices))
+
+        def reprice_product(product):
+            return revise(product, _price=changes[product.article])
+
+        published = [article for article in self.index.articles() if article in changes]
+        self.index.update(published, reprice_product)
+        self.reprice_carts(changes, reprice_product)
+        self.log_db_action("UPDATE", "products", "%s prices", len(rows))
+        return len(rows)
+
+    def refresh_products(self, rows):
+        # Строки products изменены в обход объектов (массовый импорт): для опубликованных
+        # товаров публикуем новые объекты одной версией и переносим их в корзины, чтобы корзины
+        # и интерфейс видели актуальные данные. Остальные товары будут прочитаны из таблицы
+        rows = {row[0]: row for row in rows}
+
+        def rebuild(product):
+            row = rows[product.article]
+            return None if matches_row(product, row) else self._build_product(row)
+
+        self.index.update([article for article in self.index.articles() if article in rows], rebuild)
+        self.reprice_carts(rows, rebuild)
+
+    def reprice_carts(self, articles, change):
+        # Переносим измененные товары в открытые корзины: change(товар строки) возвращает
+        # новый объект товара или None (не изменился). Перебираем меньшее из двух:
+        # измененные артикулы (O(1) на артикул) или строки корзины
+        for session_id in self.sessions.ids():
+            try:
+                session = self.sessions.get(session_id)
+            except KeyError:
+                # Сессию успели закрыть
+                continue
+            with session.lock:
+                cart = session.cart
+                if len(articles) < len(cart):
+                    lines = [line for line in map(cart.get, articles) if line is not None]
+                else:
+                    lines = [line for line in cart if line.product.article in articles]
+                for line in lines:
+                    product = change(line.product)
+                    if product is not None:
+                        cart.reprice(product)
+
+    def get_by_article(self, article):
+        # Поиск товара по первичному ключу. Опубликованный объект берется только если совпадает
+        # со строкой (как и для страниц в _resolve): строку могла изменить другая касса
+        # или импорт в отдельном процессе, и тогда объект индекса устарел
+        products = self._query_products('article = ?', (article,))
+        return products[0] if products else None
+
+    def by_author(self, author):
+        # Все товары автора (для газет - издателя), поиск по индексу idx_products_author
+        return self._query_products('author = ? ORDER BY article', (author,))
+
+    def by_genre(self, genre):
+        # Все товары жанра, поиск по индексу idx_products_genre
+        return self._query_products('genre = ? ORDER BY article', (genre,))
+
+    def load_catalog(self, category=None):
+        # Компактный колоночный каталог (catalog.Catalog) для массовой обработки в памяти.
+        # Строки читаются из курсора по одной, объекты товаров не создаются
+        if category:
+            rows = self.conn.execute(f'SELECT {PRODUCT_COLUMNS} FROM products WHERE category = ? ORDER BY article',
+                                     (category,))
+        else:
+            rows = self.conn.execute(f'SELECT {PRODUCT_COLUMNS} FROM products ORDER BY article')
+        return Catalog.from_rows(rows)
+
+    def build_search_index(self, rebuild=True):
+        # Строим поисковый индекс по всему каталогу. На больших каталогах это занимает
+        # секунды, поэтому приложение вызывает метод в фоновом потоке при запуске.
+        # Изменения каталога во время построения ждут блокировку и попадают уже в новый индекс
+        with self._search_lock:
+            if self.search_index is not None and not rebuild:
+                return self.search_index
+            index = SearchIndex()
+            index.build(self.conn.execute('SELECT article, title, author FROM products'))
+            self.search_index = index
+        return index
+
+    def _update_search_index(self, article, product):
+        # Поддерживаем поисковый индекс в актуальном состоянии (product=None - товар удален)
+        with self._search_lock:
+            if self.search_index is None:
+                return
+            if product is None:
+                self.search_index.remove(article)
+            else:
+                self.search_index.add(article, product.title, product_author(product))
+
+    def search(self, query, limit=20):
+        # Поиск по началу слов названия и автора, регистр и "ё" не важны
+        index = self.search_index or self.build_search_index(rebuild=False)
+        articles = index.search(query, limit)
+        if not articles:
+            return []
+        # Все найденные товары - одним запросом, в порядке выдачи поискового индекса
+        found = {product.article: product
+                 for product in self._query_products(f"article IN ({', '.join('?' * len(articles))})", articles)}
+        return [found[article] for article in articles if article in found]
+
+    def count_products(self, category=None):
         if category:
-            return self.products.get(category, [])
-        return {cat: items for cat, items in self.products.items()}
+            return self.conn.execute('SELECT COUNT(*) FROM products WHERE category = ?', (category,)).fetchone()[0]
+        return self.conn.execute('SELECT COUNT(*) FROM products').fetchone()[0]
 
-    def add_to_cart(self, article, category=None):
-        # Если категория не указана, ищем во всех категориях
+    def list_products(self, category=None, offset=0, limit=None, after=None):
+        # Возвращаем страницу категории, отсортированную по артикулу.
+        # after - артикул последнего товара предыдущей страницы: такая страница берется
+        # прямо из индекса (category, article), без пропуска offset строк.
+        # Без категории - словарь со страницами всех категорий
         if category is None:
-            for cat_name, products in self.products.items():
-                for product in products:
-                    if hasattr(product, 'article') and product.article == article:
-                        self.cart.append({
-                            'item': product,
-                            'category': cat_name
-                        })
-                        return True
-        else:
-            # Если категория указана, ищем только в ней
-            if category in self.products:
-                for product in self.products[category]:
-                    if hasattr(product, 'article') and product.article == article:
-                        self.cart.append({
-                            'item': product,
-                            'category': category
-                        })
-                        return True
-        
-        # Если ничего не нашли, возвращаем False
-        return False
+            # Страницы всех категорий читаются в одной транзакции - на один момент времени
+            with read_transaction(self.conn):
+                return {cat: self.list_products(cat, offset, limit, after) for cat in CATEGORIES}
+        # LIMIT -1 в SQLite означает "без ограничения"
+        limit = -1 if limit is None else limit
+        if after is not None:
+            return self._query_products('category = ? AND article > ? ORDER BY article LIMIT ?',
+                                        (category, after, limit))
+        return self._query_products('category = ? ORDER BY article LIMIT ? OFFSET ?',
+                                    (category, limit, offset))
 
-    def view_cart(self):
-        # Возвращаем содержимое корзины
-        return self.cart
+    def available(self, article):
+        # Сколько товара на складе; None - остаток не ведется
+        return self.stock.get(article)
 
-    def remove_from_cart(self, book_index):
-        # Удаляем товар из корзины по индексу
-        if 0 <= book_index < len(self.cart):
-            del self.cart[book_index]
-            return True
-        return False
+    def set_stock(self, article, quantity):
+        # Устанавливаем остаток товара (None - перестать вести остаток)
+        conn = self.conn
+        with conn:
+            cursor = conn.execute('UPDATE products SET stock = ? WHERE article = ?',
+                                  (validate_stock(quantity), article))
+        self.stock.invalidate()
+        return cursor.rowcount > 0
+
+    def restock(self, article, delta):
+        # Приход (delta > 0) или списание (delta < 0) товара одним условным UPDATE:
+        # остаток не может стать отрицательным. False - товара нет, остаток не ведется или мал
+        if isinstance(delta, bool) or not isinstance(delta, int):
+            raise ValueError("Изменение остатка должно быть целым числом")
+        cursor = run_transaction(self.conn, lambda cursor: cursor.execute(
+            'UPDATE products SET stock = stock + ?1 WHERE article = ?2 AND stock IS NOT NULL AND stock + ?1 >= 0',
+            (delta, article)))
+        self.stock.invalidate()
+        return cursor.rowcount > 0
+
+    def add_to_cart(self, article, category=None, session_id=DEFAULT_SESSION, quantity=1):
+        # Ищем товар по артикулу вместо перебора всего каталога
+        session = self.sessions.get(session_id)
+        product = self.get_by_article(article)
+        if product is None:
+            # Если ничего не нашли, возвращаем False
+            return False
+        cat_name = product_category(product)
+        if category is not None and category != cat_name:
+            return False
+        with session.lock:
+            # Не даем положить в корзину больше, чем есть на складе.
+            # Окончательно остаток проверяется и списывается при оформлении заказа
+            check_positive(quantity)
+            stock = self.stock.get(article)
+            if stock is not None:
+                line = session.cart.get(article)
+                if (line.quantity if line else 0) + quantity > stock:
+                    return False
+            self._journal(session, ADD, article, quantity, lambda: session.cart.add(product, cat_name, quantity))
+        return True
+
+    def view_cart(self, session_id=DEFAULT_SESSION):
+        # Возвращаем корзину (cart.Cart): строки с товаром, категорией и количеством
+        return self.sessions.get(session_id).cart
+
+    def remove_from_cart(self, article, quantity=None, session_id=DEFAULT_SESSION):
+        # Убираем товар из корзины по артикулу: quantity штук или всю строку
+        session = self.sessions.get(session_id)
+        with session.lock:
+            if quantity is not None:
+                check_positive(quantity)
+            if article not in session.cart:
+                return False
+            return self._journal(session, REMOVE, article, quantity, lambda: session.cart.remove(article, quantity))
+
+    def set_cart_quantity(self, article, quantity, session_id=DEFAULT_SESSION):
+        # Устанавливаем количество товара в корзине (0 - убрать)
+        session = self.sessions.get(session_id)
+        with session.lock:
+            check_not_negative(quantity)
+            if article not in session.cart:
+                return False
+            # Как и в add_to_cart, больше, чем есть на складе, не ставим
+            stock = self.stock.get(article)
+            if stock is not None and quantity > stock:
+                return False
+            return self._journal(session, SET, article, quantity,
+                                 lambda: session.cart.set_quantity(article, quantity))
 
     @log_scenario("Сохранение заказа в БД")
-    def save_order(self):
-        # Сохраняем каждый товар из корзины в базу данных
-        for item_data in self.cart:
-            product = item_data['item']
-            
-            # Обрабатываем случай с газетами, у которых вместо author - publisher
-            author = getattr(product, 'author', getattr(product, 'publisher', 'Неизвестно'))
-            
-            order_data = (product.title, author, product.price, product.genre)
-            # Логируем операцию вставки
-            self.log_db_action("INSERT", "orders", data=order_data)
-            # Выполняем вставку данных
-            self.cursor.execute('''INSERT INTO orders (product_title, author, price, genre) VALUES (?, ?, ?, ?)''',
-                                order_data)
-        # Сохраняем изменения и очищаем корзину
-        self.conn.commit()
-        self.cart.clear()
+    def save_order(self, session_id=DEFAULT_SESSION):
+        # Сохраняем всю корзину одной транзакцией: заголовок заказа и все строки через executemany
+        session = self.sessions.get(session_id)
+        with session.lock:
+            if not session.cart:
+                return None
+            lines = cart_order_lines(session.cart)
+
+            # Списание остатков, заказ и очистка журнала корзины - одна транзакция: после сбоя
+            # не может остаться ни заказа без очистки корзины, ни наоборот.
+            # Если товара не хватает, OutOfStockError откатывает транзакцию, а корзина остается
+            def write(cursor):
+                order_id = insert_order(cursor, lines)
+                self.journal.discard(session_id, cursor)
+                return order_id
+
+            try:
+                order_id = run_transaction(self.conn, write)
+            finally:
+                self.stock.invalidate()
+            session.cart.clear()
+        # Одна запись в лог на заказ вместо строки на каждый товар
+        self.log_db_action("INSERT", "orders", "order #%s, %s items", order_id, len(lines))
+        return order_id
+
+    def take_cart(self, session_id=DEFAULT_SESSION):
+        # Забираем строки корзины для фоновой записи заказа (persistence.OrderWriter) и очищаем ее.
+        # Записи корзины остаются в журнале под ключом journal_key, пока OrderWriter не удалит их
+        # в транзакции заказа: после падения до записи заказа корзина восстановится.
+        # Возвращает (строки, journal_key)
+        session = self.sessions.get(session_id)
+        with session.lock:
+            lines = list(session.cart)
+            session.cart.clear()
+            journal_key = self.journal.hold(session_id) if lines else None
+        return lines, journal_key
+
+    def restore_cart(self, lines, session_id=DEFAULT_SESSION, journal_key=None):
+        # Возвращаем строки, забранные take_cart, если заказ записать не удалось.
+        # Снимок корзины и удаление записей забранной корзины - одна транзакция
+        session = self.sessions.get(session_id)
+        with session.lock:
+            for line in lines:
+                session.cart.add(line.product, line.category, line.quantity)
+            conn = self.conn
+            with conn:
+                cursor = conn.cursor()
+                self.journal.compact(session_id, session.cart, cursor)
+                if journal_key is not None:
+                    self.journal.settle(journal_key, cursor)
+
+    def clear_cart(self, session_id=DEFAULT_SESSION):
+        session = self.sessions.get(session_id)
+        with session.lock:
+            session.cart.clear()
+            self.journal.discard(session_id)
 
-    def calculate_cart_total(self):
-        # Вычисляем общую стоимость товаров в корзине
-        return sum(item['item'].price for item in self.cart)
\ No newline at end of file
+    def calculate_cart_total(self, session_id=DEFAULT_SESSION):
+        # Общая стоимость поддерживается корзиной при каждом изменении, пересчет не нужен
+        return self.sessions.get(session_id).cart.total
@@ -0,0 +1,181 @@
+# logs.py
+# Журнал действий магазина: запись через очередь в фоновом потоке.
+# Вызывающий код только кладет в очередь кортеж (время, уровень, логгер, шаблон, аргументы):
+# без создания LogRecord, форматирования и ввода-вывода. Поток записи собирает записи,
+# пишет их пачками в файл с ротацией и сбрасывает буфер файла один раз на пачку.
+# Настройка через переменные окружения:
+#   STORE_LOG_LEVEL - уровень (DEBUG, INFO, WARNING...), по умолчанию INFO;
+#   STORE_LOG_FILE - файл журнала, по умолчанию store.log (пустая строка - не писать в файл);
+#   STORE_LOG_CONSOLE=1 - дублировать журнал в консоль, как раньше делал print
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+# Ротация: до 5 файлов по 10 МБ
+MAX_BYTES = 10 * 1024 * 1024
+BACKUP_COUNT = 5
+# Сколько записей поток записи забирает из очереди за раз
+BATCH_SIZE = 500
+
+_STOP = object()
+# Очередь и уровень журнала; задаются в setup
+_queue = None
+_level = logging.CRITICAL + 1
+
+
+# Для записей, созданных обычным logging (например, logger.exception с трассировкой):
+# кладет запись в очередь как есть. Стандартный QueueHandler.prepare форматирует сообщение
+# еще в вызывающем потоке - здесь это делает поток записи
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        return record
+
+
+# Файл с ротацией, который не сбрасывает буфер после каждой записи:
+# StreamHandler.emit вызывает flush на каждую запись, а здесь сброс делает поток записи
+class BufferedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        with self.lock:
+            if self.stream:
+                self.stream.flush()
+
+
+# Консоль с тем же пакетным сбросом
+class BufferedStreamHandler(logging.StreamHandler):
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        with self.lock:
+            self.stream.flush()
+
+
+# Поток записи: забирает записи пачками, передает обработчикам и сбрасывает их буферы
+class LogWriter:
+    def __init__(self, log_queue, handlers, batch_size=BATCH_SIZE):
+        self.queue = log_queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            batch = [record]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = False
+            for record in batch:
+                if record is _STOP:
+                    stop = True
+                    continue
+                if type(record) is tuple:
+                    record = self._make_record(*record)
+                for handler in self.handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            for handler in self.handlers:
+                handler.flush_batch()
+            if stop:
+                return
+
+    @staticmethod
+    def _make_record(created, level, name, message, args, thread_name):
+        record = logging.LogRecord(name, level, '', 0, message, args, None)
+        # Время и поток - вызывающего кода, а не потока записи
+        record.created = created
+        record.msecs = (created - int(created)) * 1000
+        record.threadName = thread_name
+        return record
+
+    def stop(self):
+        # Дописываем все, что уже в очереди, и закрываем файлы
+        if self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join()
+        for handler in self.handlers:
+            handler.close()
+
+
+def setup(level=None, filename=None, console=None):
+    # Подключаем очередь к логгеру 'store' и запускаем поток записи
+    global _queue, _level
+    level = level or os.environ.get('STORE_LOG_LEVEL', 'INFO')
+    filename = os.environ.get('STORE_LOG_FILE', 'store.log') if filename is None else filename
+    console = os.environ.get('STORE_LOG_CONSOLE') == '1' if console is None else console
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+    if filename:
+        handler = BufferedRotatingFileHandler(filename, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT,
+                                              encoding='utf-8', delay=True)
+        handlers.append(handler)
+    if console:
+        handlers.append(BufferedStreamHandler(sys.stdout))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    store_logger = logging.getLogger('store')
+    store_logger.propagate = False
+    if not handlers:
+        # Журнал никуда не пишется - записи даже не создаются
+        store_logger.setLevel(logging.CRITICAL + 1)
+        return None
+    store_logger.setLevel(level)
+    _level = store_logger.level
+    _queue = queue.SimpleQueue()
+    store_logger.addHandler(LazyQueueHandler(_queue))
+    writer = LogWriter(_queue, handlers)
+    atexit.register(writer.stop)
+    return writer
+
+
+writer = setup()
+
+
+# Логгер магазина с тем же интерфейсом, что у logging.Logger (info, warning, ...).
+# Проверка уровня и put в очередь - все, что стоит запись в вызывающем потоке
+class StoreLogger:
+    __slots__ = ('name', 'logger')
+
+    def __init__(self, name):
+        self.name = name
+        self.logger = logging.getLogger(name)
+
+    def log(self, level, message, *args):
+        if level >= _level:
+            _queue.put((time.time(), level, self.name, message, args, threading.current_thread().name))
+
+    def debug(self, message, *args):
+        self.log(logging.DEBUG, message, *args)
+
+    def info(self, message, *args):
+        self.log(logging.INFO, message, *args)
+
+    def warning(self, message, *args):
+        self.log(logging.WARNING, message, *args)
+
+    def error(self, message, *args):
+        self.log(logging.ERROR, message, *args)
+
+    def exception(self, message, *args):
+        # Трассировку нужно снять в вызывающем потоке, поэтому здесь обычный logging
+        self.logger.exception(message, *args)
+
+
+def get_logger(name):
+    # Логгеры магазина: 'db' - действия с базой, 'ui' - действия пользователя и т.д.
+    return StoreLogger(f'store.{name}')
@@ -0,0 +1,163 @@
+# metrics.py
+# Сбор метрик времени выполнения сценариев: счетчики и гистограммы задержек в памяти
+import atexit
+import json
+import os
+import threading
+
+# Гистограмма хранит 2**SUB_BITS корзин на каждую степень двойки,
+# то есть относительная погрешность перцентилей не больше 1/8
+SUB_BITS = 3
+SUB_BUCKETS = 1 << SUB_BITS
+# Перцентили, которые попадают в снимок и выгрузку
+PERCENTILES = (50, 95, 99)
+
+
+# Номер корзины для значения в наносекундах: O(1), без циклов и сортировки
+def _bucket_index(value):
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BITS - 1
+    return ((shift + 1) << SUB_BITS) + ((value >> shift) & (SUB_BUCKETS - 1))
+
+
+# Верхняя граница значений корзины (обратное преобразование к _bucket_index)
+def _bucket_upper(index):
+    if index < SUB_BUCKETS:
+        return index
+    shift = (index >> SUB_BITS) - 1
+    return (((index & (SUB_BUCKETS - 1)) | SUB_BUCKETS) + 1 << shift) - 1
+
+
+# Гистограмма задержек одного сценария
+class LatencyHistogram:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        # Корзины создаются по мере надобности, поэтому пустая гистограмма почти ничего не весит
+        self.buckets = {}
+        self.count = 0
+        self.errors = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+
+    def record(self, duration_ns, error=False):
+        index = _bucket_index(duration_ns)
+        with self.lock:
+            self.buckets[index] = self.buckets.get(index, 0) + 1
+            self.count += 1
+            self.total_ns += duration_ns
+            if error:
+                self.errors += 1
+            if self.min_ns is None or duration_ns < self.min_ns:
+                self.min_ns = duration_ns
+            if duration_ns > self.max_ns:
+                self.max_ns = duration_ns
+
+    def percentile(self, percent):
+        # Проходим корзины по возрастанию, пока не наберем нужную долю вызовов
+        with self.lock:
+            if not self.count:
+                return 0
+            rank = max(1, -(-self.count * percent // 100))
+            seen = 0
+            for index in sorted(self.buckets):
+                seen += self.buckets[index]
+                if seen >= rank:
+                    # Граница корзины не может быть больше реального максимума
+                    return min(_bucket_upper(index), self.max_ns)
+            return self.max_ns
+
+    def summary(self):
+        # Сводка в миллисекундах
+        summary = {
+            'count': self.count,
+            'errors': self.errors,
+            'total_ms': self.total_ns / 1e6,
+            'mean_ms': self.total_ns / self.count / 1e6 if self.count else 0.0,
+            'min_ms': (self.min_ns or 0) / 1e6,
+            'max_ms': self.max_ns / 1e6
+        }
+        for percent in PERCENTILES:
+            summary[f'p{percent}_ms'] = self.percentile(percent) / 1e6
+        return summary
+
+
+# Экранирование значения метки в текстовом формате Prometheus
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Реестр метрик всех сценариев
+class MetricsRegistry:
+    def __init__(self, echo=True):
+        # echo - печатать ли начало и конец каждого сценария в консоль (как раньше)
+        self.echo = echo
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def record(self, name, duration_ns, error=False):
+        self.histogram(name).record(duration_ns, error)
+
+    def reset(self):
+        # Обнуляем гистограммы на месте: декораторы держат ссылки на них
+        for histogram in list(self._histograms.values()):
+            with histogram.lock:
+                histogram.clear()
+
+    def snapshot(self):
+        # Сводка по всем сценариям: {сценарий: {count, errors, mean_ms, p50_ms, ...}}
+        return {name: histogram.summary() for name, histogram in list(self._histograms.items())}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=indent)
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(self.to_json())
+
+    def to_prometheus(self, prefix='store_scenario'):
+        # Текстовый формат Prometheus: summary с квантилями плюс счетчик ошибок
+        lines = [
+            f'# HELP {prefix}_duration_seconds Длительность сценариев магазина',
+            f'# TYPE {prefix}_duration_seconds summary'
+        ]
+        errors = [
+            f'# HELP {prefix}_errors_total Сценарии, завершившиеся исключением',
+            f'# TYPE {prefix}_errors_total counter'
+        ]
+        for name, summary in sorted(self.snapshot().items()):
+            label = f'scenario="{_label(name)}"'
+            for percent in PERCENTILES:
+                value = summary[f'p{percent}_ms'] / 1e3
+                lines.append(f'{prefix}_duration_seconds{{{label},quantile="{percent / 100}"}} {value:.9f}')
+            lines.append(f'{prefix}_duration_seconds_sum{{{label}}} {summary["total_ms"] / 1e3:.9f}')
+            lines.append(f'{prefix}_duration_seconds_count{{{label}}} {summary["count"]}')
+            errors.append(f'{prefix}_errors_total{{{label}}} {summary["errors"]}')
+        return '\n'.join(lines + errors) + '\n'
+
+    def write_prometheus(self, path):
+        # Пишем во временный файл и переименовываем, чтобы сборщик не прочитал файл наполовину
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+# Общий реестр приложения.
+# STORE_SCENARIO_ECHO=0 отключает печать сценариев в консоль,
+# STORE_METRICS_FILE=путь - выгрузка метрик в формате Prometheus при выходе
+registry = MetricsRegistry(echo=os.environ.get('STORE_SCENARIO_ECHO', '1') != '0')
+
+if os.environ.get('STORE_METRICS_FILE'):
+    atexit.register(registry.write_prometheus, os.environ['STORE_METRICS_FILE'])
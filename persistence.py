@@ -0,0 +1,133 @@
+# persistence.py
+# Фоновая запись заказов в базу данных, чтобы интерфейс не ждал диск
+import queue
+import threading
+import time
+
+from database import connect, run_transaction
+from library import DatabaseLoggingMixin, insert_order, db_logger
+
+# Маркер остановки потока записи
+_STOP = object()
+
+
+# Задание на запись одного заказа
+class OrderJob:
+    def __init__(self, lines, on_done=None, on_error=None, journal_key=None):
+        # Строки заказа в формате library.order_line
+        self.lines = lines
+        # Ключ записей забранной корзины из Store.take_cart: они удаляются вместе с записью заказа
+        self.journal_key = journal_key
+        # on_done(order_id) и on_error(exception) вызываются из потока записи
+        self.on_done = on_done
+        self.on_error = on_error
+
+
+# Поток записи заказов с ограниченной очередью.
+# Задания, пришедшие почти одновременно, записываются одной транзакцией (group commit),
+# поэтому несколько оформлений подряд стоят одного commit, а не нескольких
+class OrderWriter(DatabaseLoggingMixin):
+    def __init__(self, db_path, journal=None, max_queue=100, batch_window=0.05, max_batch=50):
+        self.db_path = db_path
+        # Журнал корзин магазина (journal.CartJournal), записи которого очищаются в транзакции заказа
+        self.journal = journal
+        # Сколько ждать следующие задания, прежде чем записывать пачку (в секундах)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        # Ограниченная очередь: если диск не успевает, submit ждет, а не копит задания без конца
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name='order-writer', daemon=True)
+        self._closed = False
+        self._thread.start()
+
+    def submit(self, lines, on_done=None, on_error=None, timeout=1.0, journal_key=None):
+        # Ставим заказ в очередь; если очередь полна дольше timeout - queue.Full.
+        # journal_key - из Store.take_cart, если заказ сделан из корзины
+        if self._closed:
+            raise RuntimeError("Поток записи заказов уже остановлен")
+        job = OrderJob(lines, on_done, on_error, journal_key)
+        self._queue.put(job, timeout=timeout)
+        return job
+
+    def flush(self):
+        # Ждем, пока все поставленные задания будут записаны
+        self._queue.join()
+
+    def close(self):
+        # Дописываем все, что осталось в очереди, и останавливаем поток
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _collect_batch(self, first):
+        # Набираем пачку: первое задание и все, что успело прийти за batch_window.
+        # Возвращаем пачку и признак того, что за ней пришла команда остановки
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is _STOP:
+                self._queue.task_done()
+                return batch, True
+            batch.append(job)
+        return batch, False
+
+    def _run(self):
+        # Соединение SQLite нельзя передавать между потоками, поэтому открываем свое
+        conn = connect(self.db_path)
+        try:
+            while True:
+                job = self._queue.get()
+                if job is _STOP:
+                    self._queue.task_done()
+                    break
+                batch, stop = self._collect_batch(job)
+                try:
+                    self._write(conn, batch)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if stop:
+                    break
+        finally:
+            conn.close()
+
+    def _insert(self, cursor, job):
+        # Заказ и очистка журнала его корзины - одна транзакция: после сбоя
+        # остается либо заказ, либо корзина в журнале, но не ни то ни другое
+        order_id = insert_order(cursor, job.lines)
+        if self.journal is not None and job.journal_key is not None:
+            self.journal.settle(job.journal_key, cursor)
+        return order_id
+
+    def _write(self, conn, batch):
+        try:
+            order_ids = run_transaction(conn, lambda cursor: [self._insert(cursor, job) for job in batch])
+        except Exception as error:
+            # Пачка откатилась целиком - пишем задания по одному,
+            # чтобы ошибка одного заказа не отменяла остальные
+            if len(batch) > 1:
+                for job in batch:
+                    self._write(conn, [job])
+                return
+            self._notify(batch[0].on_error, error)
+            return
+        self.log_db_action("INSERT", "orders", "%s orders in one commit", len(batch))
+        for job, order_id in zip(batch, order_ids):
+            self._notify(job.on_done, order_id)
+
+    @staticmethod
+    def _notify(callback, value):
+        # Ошибка в обработчике не должна останавливать поток записи
+        if callback is None:
+            return
+        try:
+            callback(value)
+        except Exception:
+            db_logger.exception("Ошибка в обработчике записи заказа")
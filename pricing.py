@@ -0,0 +1,59 @@
+# pricing.py
+# Пакетный расчет и проверка новых цен для массовой переоценки
+import math
+from array import array
+
+# NumPy необязателен: без него цены считаются одним проходом по компактному array('d')
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# До скольких знаков округляем новые цены (копейки)
+DECIMALS = 2
+
+
+# Переоценка отклонена целиком: параметры некорректны или хотя бы одна новая цена не прошла проверку
+class RepricingError(ValueError):
+    def __init__(self, message, rejected=0, article=None):
+        super().__init__(message)
+        self.rejected = rejected
+        self.article = article
+
+
+def rejected_prices(rejected, article, price):
+    # Новая цена должна быть конечным неотрицательным числом
+    return RepricingError(f"Переоценка отклонена: {rejected} цен меньше нуля или не являются конечным числом "
+                          f"(например, артикул {article}: {price})", rejected, article)
+
+
+def check_change(percent, amount):
+    # Параметры переоценки проверяем так же, как цены: только числа, причем конечные (не inf и не nan)
+    for value in (percent, amount):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise RepricingError("Изменение цены должно быть числом")
+        if not math.isfinite(value):
+            raise RepricingError(f"Изменение цены должно быть конечным числом: {value}")
+
+
+def new_prices(articles, prices, percent=0, amount=0, decimals=DECIMALS):
+    # Новые цены: price * (1 + percent / 100) + amount, с округлением.
+    # Все цены проверяются одним проходом до того, как хоть одна будет применена;
+    # проверка типа не нужна - в колонке только числа, а результат арифметики тоже число
+    check_change(percent, amount)
+    factor = 1 + percent / 100
+    if np is not None:
+        result = np.round(np.asarray(prices, dtype=np.float64) * factor + amount, decimals)
+        invalid = np.flatnonzero(~np.isfinite(result) | (result < 0))
+        if invalid.size:
+            first = int(invalid[0])
+            raise rejected_prices(int(invalid.size), articles[first], float(result[first]))
+        result = result.tolist()
+    else:
+        result = array('d', [round(price * factor + amount, decimals) for price in prices])
+        # Сравнение с nan всегда ложно, поэтому 0 <= price < inf отсекает и отрицательные, и nan, и inf
+        invalid = [index for index, price in enumerate(result) if not 0 <= price < math.inf]
+        if invalid:
+            raise rejected_prices(len(invalid), articles[invalid[0]], result[invalid[0]])
+    # Целые цены оставляем целыми, как у товаров, созданных вручную
+    return [int(price) if price.is_integer() else price for price in result]
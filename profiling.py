@@ -0,0 +1,90 @@
+# profiling.py
+# Профилирование по запросу: cProfile вокруг следующих N вызовов выбранного действия.
+# Включается без отдельной сборки - переменной окружения
+#   STORE_PROFILE_ACTIONS="clear_cart:20,test_action:5:/tmp/test.pstats"
+# (действие:число вызовов[:файл]) или вызовом profiler.arm из кода
+import cProfile
+import io
+import os
+import pstats
+import threading
+
+# Сколько строк самых дорогих функций попадает в текстовый отчет
+REPORT_LINES = 30
+
+
+# Один запрос на профилирование: общий профиль на calls вызовов действия
+class ProfileRequest:
+    def __init__(self, calls, path):
+        self.remaining = calls
+        self.path = path
+        self.profile = cProfile.Profile()
+
+
+class ActionProfiler:
+    def __init__(self):
+        # Действие -> ProfileRequest; пустой словарь - профилирование выключено
+        self.armed = {}
+        # cProfile нельзя включить дважды одновременно: второй параллельный вызов идет без профиля
+        self._running = threading.Lock()
+
+    def arm(self, action, calls=10, path=None):
+        # Профилируем следующие calls вызовов действия и пишем статистику в path
+        if calls <= 0:
+            raise ValueError("Число вызовов должно быть положительным")
+        path = path or f'profile_{action}.pstats'
+        self.armed[action] = ProfileRequest(calls, path)
+        return path
+
+    def disarm(self, action):
+        return self.armed.pop(action, None) is not None
+
+    def call(self, action, func, args, kwargs):
+        request = self.armed.get(action)
+        if request is None or not self._running.acquire(blocking=False):
+            return func(*args, **kwargs)
+        try:
+            request.profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                request.profile.disable()
+                request.remaining -= 1
+                if request.remaining == 0 and self.armed.get(action) is request:
+                    del self.armed[action]
+                    self._dump(request)
+        finally:
+            self._running.release()
+
+    @staticmethod
+    def _dump(request):
+        # Двоичная статистика (для pstats/snakeviz) и текстовый отчет рядом с ней
+        request.profile.dump_stats(request.path)
+        report = io.StringIO()
+        pstats.Stats(request.profile, stream=report).sort_stats('cumulative').print_stats(REPORT_LINES)
+        with open(f'{request.path}.txt', 'w', encoding='utf-8') as file:
+            file.write(report.getvalue())
+
+
+def parse_requests(value, source='STORE_PROFILE_ACTIONS'):
+    # "действие:вызовов[:файл],..." -> [(действие, вызовов, файл или None)].
+    # Некорректный элемент - ValueError с именем переменной, а не голая ошибка int()
+    requests = []
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        action, _, rest = item.partition(':')
+        calls, _, path = rest.partition(':')
+        try:
+            calls = int(calls or 10)
+        except ValueError:
+            calls = 0
+        if not action or calls < 1:
+            raise ValueError(f"{source}: ожидается 'действие:вызовов[:файл]' с целым числом вызовов "
+                             f"не меньше 1, получено {item!r}")
+        requests.append((action, calls, path or None))
+    return requests
+
+
+profiler = ActionProfiler()
+
+for _action, _calls, _path in parse_requests(os.environ.get('STORE_PROFILE_ACTIONS', '')):
+    profiler.arm(_action, _calls, _path)
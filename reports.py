@@ -0,0 +1,123 @@
+# reports.py
+# Сводные таблицы продаж по жанрам, авторам и дням.
+# Сводки обновляются в той же транзакции, что и запись заказа (см. library.insert_order),
+# поэтому отчеты читают несколько готовых строк вместо просмотра всей истории заказов
+
+# Одна таблица на разрез: ключ, выручка, число проданных штук и число заказов
+SUMMARY_TABLES = {
+    'sales_by_genre': 'genre',
+    'sales_by_author': 'author',
+    'sales_by_day': 'day'
+}
+# Ключ для строк заказа без жанра или автора
+UNKNOWN = 'Неизвестно'
+
+
+def create_report_tables(cursor):
+    for table, key in SUMMARY_TABLES.items():
+        cursor.execute(f'''CREATE TABLE IF NOT EXISTS {table} (
+            {key} TEXT PRIMARY KEY,
+            revenue NUMERIC NOT NULL DEFAULT 0,
+            items INTEGER NOT NULL DEFAULT 0,
+            orders INTEGER NOT NULL DEFAULT 0
+        )''')
+    # Рейтинги (топ авторов и жанров) читаются из индекса по выручке без сортировки таблицы
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sales_by_author_revenue ON sales_by_author (revenue)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sales_by_genre_revenue ON sales_by_genre (revenue)')
+    # Выборка заказов за период идет по индексу, а не по всей таблице
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders (created_at)')
+
+
+def _upsert(cursor, table, key, rows):
+    # rows: (ключ, выручка, штук, заказов) - прибавляем к уже накопленным значениям
+    cursor.executemany(f'''INSERT INTO {table} ({key}, revenue, items, orders) VALUES (?, ?, ?, ?)
+                           ON CONFLICT({key}) DO UPDATE SET
+                               revenue = revenue + excluded.revenue,
+                               items = items + excluded.items,
+                               orders = orders + excluded.orders''', rows)
+
+
+def record_sales(cursor, lines, created_at):
+    # Строки заказа: (артикул, название, автор, цена, жанр, количество).
+    # Сначала суммируем заказ в памяти, чтобы на каждый ключ пришелся один UPSERT
+    # и заказ с несколькими книгами одного автора считался одним заказом
+    by_genre = {}
+    by_author = {}
+    for _, _, author, price, genre, quantity in lines:
+        for totals, key in ((by_genre, genre or UNKNOWN), (by_author, author or UNKNOWN)):
+            revenue, items = totals.get(key, (0, 0))
+            totals[key] = (revenue + price * quantity, items + quantity)
+    _upsert(cursor, 'sales_by_genre', 'genre', [(key, revenue, items, 1) for key, (revenue, items) in by_genre.items()])
+    _upsert(cursor, 'sales_by_author', 'author', [(key, revenue, items, 1) for key, (revenue, items) in by_author.items()])
+    # Заказы, перенесенные из старой схемы, не имеют даты и в сводку по дням не попадают
+    if created_at:
+        revenue = sum(line[3] * line[5] for line in lines)
+        items = sum(line[5] for line in lines)
+        _upsert(cursor, 'sales_by_day', 'day', [(created_at[:10], revenue, items, 1)])
+
+
+def backfill(conn):
+    # Однократное заполнение сводок по уже записанным заказам (одной транзакцией).
+    # Ничего не делает, если сводки уже заполнены или заказов нет
+    if conn.execute('SELECT 1 FROM sales_by_genre LIMIT 1').fetchone():
+        return False
+    if not conn.execute('SELECT 1 FROM order_items LIMIT 1').fetchone():
+        return False
+    with conn:
+        for table, key, column in (('sales_by_genre', 'genre', 'genre'), ('sales_by_author', 'author', 'author')):
+            conn.execute(f'''INSERT INTO {table} ({key}, revenue, items, orders)
+                             SELECT COALESCE(NULLIF({column}, ''), ?), SUM(price * quantity), SUM(quantity), COUNT(DISTINCT order_id)
+                             FROM order_items GROUP BY COALESCE(NULLIF({column}, ''), ?)''', (UNKNOWN, UNKNOWN))
+        conn.execute('''INSERT INTO sales_by_day (day, revenue, items, orders)
+                        SELECT substr(created_at, 1, 10), SUM(total), SUM(items_count), COUNT(*)
+                        FROM orders WHERE created_at IS NOT NULL GROUP BY substr(created_at, 1, 10)''')
+    return True
+
+
+# Запросы отчетов. Время ответа зависит от числа жанров, авторов или дней в периоде,
+# но не от числа заказов
+
+def _rows(cursor, key):
+    return [{key: row[0], 'revenue': row[1], 'items': row[2], 'orders': row[3]} for row in cursor]
+
+
+def revenue_by_genre(conn):
+    return _rows(conn.execute('SELECT genre, revenue, items, orders FROM sales_by_genre ORDER BY revenue DESC'),
+                 'genre')
+
+
+def top_genres(conn, limit=10):
+    return _rows(conn.execute('''SELECT genre, revenue, items, orders FROM sales_by_genre
+                                 ORDER BY revenue DESC LIMIT ?''', (limit,)), 'genre')
+
+
+def top_authors(conn, limit=10):
+    return _rows(conn.execute('''SELECT author, revenue, items, orders FROM sales_by_author
+                                 ORDER BY revenue DESC LIMIT ?''', (limit,)), 'author')
+
+
+def author_sales(conn, author):
+    row = conn.execute('SELECT author, revenue, items, orders FROM sales_by_author WHERE author = ?',
+                       (author,)).fetchone()
+    return _rows([row], 'author')[0] if row else None
+
+
+def daily_totals(conn, start=None, end=None):
+    # Итоги по дням за период [start, end] (даты 'ГГГГ-ММ-ДД', границы включительно)
+    query = 'SELECT day, revenue, items, orders FROM sales_by_day WHERE day >= ? AND day <= ? ORDER BY day'
+    return _rows(conn.execute(query, (start or '', end or '9999-12-31')), 'day')
+
+
+def period_totals(conn, start=None, end=None):
+    # Выручка, штуки и заказы за период одной суммой
+    row = conn.execute('''SELECT COALESCE(SUM(revenue), 0), COALESCE(SUM(items), 0), COALESCE(SUM(orders), 0)
+                          FROM sales_by_day WHERE day >= ? AND day <= ?''',
+                       (start or '', end or '9999-12-31')).fetchone()
+    return {'revenue': row[0], 'items': row[1], 'orders': row[2]}
+
+
+def orders_between(conn, start, end):
+    # Заказы за период по индексу idx_orders_created_at: (номер, время, сумма, штук)
+    return conn.execute('''SELECT id, created_at, total, items_count FROM orders
+                           WHERE created_at >= ? AND created_at < ? ORDER BY created_at''',
+                        (start, end)).fetchall()
@@ -0,0 +1,132 @@
+# search.py
+# Поиск товаров по названию и автору по мере ввода (инвертированный индекс с поиском по префиксу)
+import re
+import threading
+from bisect import bisect_left, insort
+
+# Слова из букв и цифр любого алфавита, в том числе кириллицы
+TOKEN_RE = re.compile(r'\w+')
+# Символ больше любой буквы: граница диапазона слов с заданным префиксом
+PREFIX_END = '\U0010ffff'
+
+
+# Приводим текст к единому виду: casefold вместо lower (правильно работает для любых алфавитов),
+# "ё" ищется как "е"
+def normalize(text):
+    return text.casefold().replace('ё', 'е')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(normalize(text or ''))
+
+
+# Инвертированный индекс: слово -> артикулы товаров, в названии или авторе которых оно есть.
+# Отсортированный словарь слов позволяет найти все слова с префиксом двоичным поиском,
+# поэтому запрос не просматривает каталог, а результат собирается до limit и сразу отдается
+class SearchIndex:
+    def __init__(self):
+        # Артикул -> слова товара (для проверки остальных слов запроса)
+        self._docs = {}
+        # Слово -> список артикулов
+        self._postings = {}
+        # Все слова по алфавиту
+        self._vocabulary = []
+        # Сколько устаревших записей осталось в списках после удаления товаров
+        self._stale = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, article):
+        return article in self._docs
+
+    def build(self, rows):
+        # Массовое построение по строкам (артикул, название, автор): словарь сортируется один раз
+        with self._lock:
+            for article, title, author in rows:
+                self._index(article, title, author)
+            self._vocabulary = sorted(self._postings)
+
+    def add(self, article, title, author):
+        # Добавляем или обновляем один товар
+        with self._lock:
+            if article in self._docs:
+                self._drop(article)
+            for token in self._index(article, title, author):
+                if len(self._postings[token]) == 1:
+                    insort(self._vocabulary, token)
+
+    def remove(self, article):
+        with self._lock:
+            return self._drop(article)
+
+    def search(self, query, limit=20):
+        # Артикулы товаров, где каждое слово запроса является началом какого-либо слова товара
+        terms = tokenize(query)
+        if not terms:
+            return []
+        vocabulary = self._vocabulary
+        ranges = []
+        for term in set(terms):
+            low = bisect_left(vocabulary, term)
+            high = bisect_left(vocabulary, term + PREFIX_END, low)
+            if low == high:
+                # Хотя бы одно слово запроса ничему не соответствует
+                return []
+            ranges.append((high - low, -len(term), term, low, high))
+        # Перебираем самое редкое слово запроса, остальные проверяем по словам товара
+        ranges.sort()
+        _, _, driver, low, high = ranges[0]
+        others = [entry[2] for entry in ranges[1:]]
+        results = []
+        seen = set()
+        for position in range(low, high):
+            for article in self._postings.get(vocabulary[position], ()):
+                if article in seen:
+                    continue
+                seen.add(article)
+                tokens = self._docs.get(article)
+                # Записи удаленных или измененных товаров отсеиваются здесь
+                if tokens is None or not self._matches(tokens, driver):
+                    continue
+                if all(self._matches(tokens, term) for term in others):
+                    results.append(article)
+                    if len(results) >= limit:
+                        return results
+        return results
+
+    @staticmethod
+    def _matches(tokens, term):
+        for token in tokens:
+            if token.startswith(term):
+                return True
+        return False
+
+    def _index(self, article, title, author):
+        # Возвращает новые слова товара; словарь _vocabulary обновляет вызывающий код
+        tokens = tuple(dict.fromkeys(tokenize(title) + tokenize(author)))
+        self._docs[article] = tokens
+        for token in tokens:
+            self._postings.setdefault(token, []).append(article)
+        return tokens
+
+    def _drop(self, article):
+        # Удаляем товар из документов; записи в списках чистим пакетно, когда их накопится много
+        tokens = self._docs.pop(article, None)
+        if tokens is None:
+            return False
+        self._stale += len(tokens)
+        if self._stale > len(self._docs):
+            self._compact()
+        return True
+
+    def _compact(self):
+        # Перестраиваем списки артикулов только по актуальным товарам
+        postings = {}
+        for article, tokens in self._docs.items():
+            for token in tokens:
+                postings.setdefault(token, []).append(article)
+        self._postings = postings
+        self._vocabulary = sorted(postings)
+        self._stale = 0
@@ -0,0 +1,331 @@
+# server.py
+# HTTP API магазина для касс без интерфейса Kivy: каталог, поиск, корзины и оформление заказа в JSON.
+# Один процесс с одним Store обслуживает несколько тонких касс. Сетевой ввод-вывод идет
+# в цикле asyncio, а блокирующие операции Store (SQLite) - в пуле потоков;
+# у каждого потока пула свое соединение с базой (см. database.ThreadConnections).
+# Запуск: python server.py [--host 127.0.0.1] [--port 8080] [--db store.db] [--workers 8]
+#
+# Маршруты:
+#   GET    /products?category=books&limit=50&after=123   страница категории (after - последний артикул)
+#   GET    /products/<артикул>                           товар и его остаток
+#   GET    /search?q=<запрос>&limit=20                   поиск по названию и автору
+#   POST   /sessions                                     новая сессия кассы -> {"session_id": ...}
+#   DELETE /sessions/<сессия>                            закрыть сессию
+#   GET    /sessions/<сессия>/cart                       корзина
+#   POST   /sessions/<сессия>/cart                       {"article": 10, "quantity": 1} - добавить товар
+#   PUT    /sessions/<сессия>/cart/<артикул>             {"quantity": 3} - установить количество
+#   DELETE /sessions/<сессия>/cart/<артикул>?quantity=1  убрать товар (без quantity - всю строку)
+#   POST   /sessions/<сессия>/checkout                   оформить заказ -> {"order_id": ...}
+#   GET    /metrics                                      метрики сценариев в формате Prometheus
+import argparse
+import asyncio
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from catalog_index import product_author
+from library import Store, CATEGORIES, product_category
+from logs import get_logger
+from metrics import registry
+from sessions import DEFAULT_SESSION, UnknownSessionError
+from stock import OutOfStockError
+
+http_logger = get_logger('http')
+
+WORKERS = 8
+# Ограничения запроса: заголовки и тело больше этого отклоняются
+MAX_HEADER_LINES = 100
+MAX_BODY = 1024 * 1024
+PAGE_LIMIT = 50
+# Целые параметры должны помещаться в INTEGER SQLite (64 бита со знаком),
+# иначе запрос к базе падает с OverflowError
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+# Больше стольких штук одного товара за раз в корзину не кладем
+MAX_QUANTITY = 10000
+
+
+# Ошибка запроса с HTTP-статусом и текстом для клиента
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def product_json(product):
+    return {
+        'article': product.article,
+        'category': product_category(product),
+        'title': product.title,
+        'author': product_author(product),
+        'price': product.price,
+        'genre': product.genre,
+        'date_published': getattr(product, 'date_published', None)
+    }
+
+
+def cart_json(cart):
+    return {
+        'lines': [{'product': product_json(line.product), 'quantity': line.quantity,
+                   'unit_price': line.unit_price, 'subtotal': line.subtotal} for line in cart],
+        'total': cart.total,
+        'items_count': cart.items_count
+    }
+
+
+def int_param(value, name, default=None, minimum=INT64_MIN, maximum=INT64_MAX):
+    # Целый параметр запроса или тела JSON. Дробные числа (1.7) не округляются, а отклоняются,
+    # значения вне [minimum, maximum] - тоже (по умолчанию - диапазон INTEGER SQLite)
+    if value is None:
+        if default is None:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Не указан параметр {name}")
+        return default
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Параметр {name} должен быть целым числом")
+    try:
+        value = int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Параметр {name} должен быть целым числом") from None
+    if value < minimum:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Параметр {name} должен быть не меньше {minimum}")
+    if value > maximum:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Параметр {name} должен быть не больше {maximum}")
+    return value
+
+
+# Обработчики маршрутов: синхронные функции над Store, выполняются в пуле потоков.
+# Возвращают (статус, тело ответа)
+class StoreAPI:
+    def __init__(self, store):
+        self.store = store
+        # (метод, шаблон пути, обработчик); группы шаблона передаются обработчику аргументами
+        self.routes = [
+            ('GET', r'/products', self.list_products),
+            ('GET', r'/products/(\d+)', self.get_product),
+            ('GET', r'/search', self.search),
+            ('POST', r'/sessions', self.open_session),
+            ('DELETE', r'/sessions/(\w+)', self.close_session),
+            ('GET', r'/sessions/(\w+)/cart', self.view_cart),
+            ('POST', r'/sessions/(\w+)/cart', self.add_to_cart),
+            ('PUT', r'/sessions/(\w+)/cart/(\d+)', self.set_quantity),
+            ('DELETE', r'/sessions/(\w+)/cart/(\d+)', self.remove_from_cart),
+            ('POST', r'/sessions/(\w+)/checkout', self.checkout)
+        ]
+        self.routes = [(method, re.compile(pattern + '$'), handler) for method, pattern, handler in self.routes]
+
+    def resolve(self, method, path):
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match:
+                if route_method == method:
+                    return handler, match.groups()
+                allowed = True
+        if allowed:
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Метод не поддерживается")
+        raise HTTPError(HTTPStatus.NOT_FOUND, "Нет такого адреса")
+
+    def list_products(self, query, body):
+        category = query.get('category', 'books')
+        if category not in CATEGORIES:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Неизвестная категория: {category}")
+        limit = min(int_param(query.get('limit'), 'limit', PAGE_LIMIT, minimum=1), 1000)
+        after = query.get('after')
+        after = None if after is None else int_param(after, 'after')
+        products = self.store.list_products(category, limit=limit, after=after)
+        return HTTPStatus.OK, {
+            'products': [product_json(product) for product in products],
+            # Артикул для следующей страницы (keyset-пагинация)
+            'next_after': products[-1].article if len(products) == limit else None
+        }
+
+    def get_product(self, query, body, article):
+        product = self.store.get_by_article(int_param(article, 'article'))
+        if product is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Товар {article} не найден")
+        result = product_json(product)
+        result['stock'] = self.store.available(product.article)
+        return HTTPStatus.OK, result
+
+    def search(self, query, body):
+        limit = min(int_param(query.get('limit'), 'limit', 20, minimum=1), 100)
+        products = self.store.search(query.get('q', ''), limit)
+        return HTTPStatus.OK, {'products': [product_json(product) for product in products]}
+
+    def open_session(self, query, body):
+        return HTTPStatus.CREATED, {'session_id': self.store.open_session()}
+
+    def close_session(self, query, body, session_id):
+        if not self.store.close_session(session_id):
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Неизвестная сессия: {session_id}")
+        return HTTPStatus.OK, {'closed': session_id}
+
+    def cart_response(self, session_id, status=HTTPStatus.OK):
+        # Корзину сериализуем под блокировкой сессии: другая касса может менять ее в соседнем потоке
+        session = self.store.sessions.get(session_id)
+        with session.lock:
+            return status, cart_json(session.cart)
+
+    def view_cart(self, query, body, session_id):
+        return self.cart_response(session_id)
+
+    def add_to_cart(self, query, body, session_id):
+        article = int_param(body.get('article'), 'article')
+        quantity = int_param(body.get('quantity'), 'quantity', 1, minimum=1, maximum=MAX_QUANTITY)
+        if not self.store.add_to_cart(article, session_id=session_id, quantity=quantity):
+            raise HTTPError(HTTPStatus.CONFLICT, f"Товар {article} не найден или закончился на складе")
+        return self.cart_response(session_id)
+
+    def set_quantity(self, query, body, session_id, article):
+        quantity = int_param(body.get('quantity'), 'quantity', minimum=0, maximum=MAX_QUANTITY)
+        if not self.store.set_cart_quantity(int_param(article, 'article'), quantity, session_id=session_id):
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Товара {article} нет в корзине")
+        return self.cart_response(session_id)
+
+    def remove_from_cart(self, query, body, session_id, article):
+        quantity = query.get('quantity')
+        quantity = None if quantity is None else int_param(quantity, 'quantity', minimum=1, maximum=MAX_QUANTITY)
+        if not self.store.remove_from_cart(int_param(article, 'article'), quantity, session_id=session_id):
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Товара {article} нет в корзине")
+        return self.cart_response(session_id)
+
+    def checkout(self, query, body, session_id):
+        order_id = self.store.save_order(session_id)
+        if order_id is None:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Корзина пуста")
+        return HTTPStatus.CREATED, {'order_id': order_id}
+
+    def handle(self, method, target, body):
+        # Полный разбор и выполнение запроса (в потоке пула): (статус, тело)
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            handler, arguments = self.resolve(method, url.path)
+            # Сессия по умолчанию - корзина приложения Kivy, кассам через API она недоступна
+            if url.path.startswith('/sessions/') and arguments[0] == DEFAULT_SESSION:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"Неизвестная сессия: {DEFAULT_SESSION}")
+            if body:
+                try:
+                    body = json.loads(body)
+                except ValueError:
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, "Тело запроса должно быть JSON") from None
+                if not isinstance(body, dict):
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, "Тело запроса должно быть объектом JSON")
+            return handler(query, body or {}, *arguments)
+        except HTTPError as error:
+            return error.status, {'error': error.message}
+        except UnknownSessionError as error:
+            return HTTPStatus.NOT_FOUND, {'error': error.args[0]}
+        except OutOfStockError as error:
+            return HTTPStatus.CONFLICT, {'error': str(error), 'shortages': error.shortages}
+        except ValueError as error:
+            return HTTPStatus.BAD_REQUEST, {'error': str(error)}
+
+
+# Минимальный HTTP/1.1 поверх asyncio: keep-alive, тело по Content-Length, ответы в JSON
+class StoreServer:
+    def __init__(self, store, workers=WORKERS):
+        self.api = StoreAPI(store)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='store-api')
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await self.read_request(reader)
+                if request is None:
+                    break
+                method, target, body, keep_alive = request
+                status, payload = await self.dispatch(method, target, body)
+                self.write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except HTTPError as error:
+            self.write_response(writer, error.status, {'error': error.message}, False)
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode('latin-1').split()
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Некорректная строка запроса") from None
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Слишком много заголовков")
+        length = int_param(headers.get('content-length'), 'Content-Length', 0)
+        if length > MAX_BODY:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Слишком большое тело запроса")
+        body = await reader.readexactly(length) if length else b''
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+        return method.upper(), target, body, keep_alive
+
+    async def dispatch(self, method, target, body):
+        if method == 'GET' and target == '/metrics':
+            return HTTPStatus.OK, registry.to_prometheus()
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, self.api.handle, method, target, body)
+        except Exception:
+            http_logger.exception("Ошибка обработки запроса %s %s", method, target)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': "Внутренняя ошибка сервера"}
+
+    @staticmethod
+    def write_response(writer, status, payload, keep_alive):
+        if isinstance(payload, str):
+            body = payload.encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json; charset=utf-8'
+        head = (f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+                f'Content-Type: {content_type}\r\n'
+                f'Content-Length: {len(body)}\r\n'
+                f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+        writer.write(head.encode('latin-1') + body)
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        http_logger.info("API магазина слушает %s:%s", host, port)
+        async with server:
+            await server.serve_forever()
+
+
+async def main(host, port, db_path, workers):
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1)
+    # Store (проверка схемы, восстановление корзин) создаем вне цикла событий
+    store = await loop.run_in_executor(executor, partial(Store, db_path))
+    executor.shutdown()
+    # Поисковый индекс строится в фоне; до его готовности поиск строит индекс сам по запросу
+    loop.run_in_executor(None, store.build_search_index)
+    await StoreServer(store, workers).serve(host, port)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='HTTP API магазина')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--db', default='store.db', help='файл базы данных магазина')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='потоков для работы с базой')
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.host, args.port, args.db, args.workers))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,60 @@
+# sessions.py
+# Сессии покупателей: у каждой кассы (терминала) своя корзина
+import threading
+import uuid
+
+from cart import Cart
+
+# Сессия по умолчанию - ее использует однооконное Kivy-приложение
+DEFAULT_SESSION = 'default'
+
+
+# Ошибка при обращении к несуществующей сессии
+class UnknownSessionError(KeyError):
+    pass
+
+
+# Одна сессия покупателя: корзина и блокировка для нее.
+# Блокировка своя у каждой сессии, поэтому разные кассы не ждут друг друга
+class Session:
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.cart = Cart()
+        self.lock = threading.RLock()
+
+
+# Менеджер сессий: создает, выдает и закрывает сессии покупателей
+class SessionManager:
+    def __init__(self):
+        # Общая блокировка нужна только для изменения словаря сессий
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self.open(DEFAULT_SESSION)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def open(self, session_id=None):
+        # Создаем сессию (или возвращаем существующую с тем же идентификатором)
+        session_id = session_id or uuid.uuid4().hex
+        with self._lock:
+            if session_id not in self._sessions:
+                self._sessions[session_id] = Session(session_id)
+        return session_id
+
+    def close(self, session_id):
+        # Закрываем сессию вместе с ее корзиной
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def get(self, session_id):
+        try:
+            return self._sessions[session_id]
+        except KeyError:
+            raise UnknownSessionError(f"Неизвестная сессия: {session_id}") from None
+
+    def ids(self):
+        return list(self._sessions)
@@ -0,0 +1,114 @@
+# stock.py
+# Остатки товаров: резервирование при оформлении заказа и кэш доступного количества.
+# Остаток хранится в колонке products.stock; NULL - остаток не ведется (товар без ограничений)
+import threading
+
+# Строки заказа для списания: временная таблица соединения, которая очищается после каждого заказа.
+# Через нее размер заказа не ограничен числом параметров запроса, а списание обходится
+# без UPDATE ... FROM и JSON-операторов ->>, которых нет в SQLite до 3.38
+WANTED_TABLE = '''CREATE TEMP TABLE IF NOT EXISTS stock_wanted (
+    article INTEGER PRIMARY KEY,
+    quantity INTEGER NOT NULL
+)'''
+
+# Списание остатков по всему заказу одним условным UPDATE.
+# Условие NOT EXISTS проверяет весь заказ сразу: если хоть одного товара не хватает,
+# не списывается ничего
+RESERVE = '''UPDATE products
+    SET stock = stock - (SELECT quantity FROM stock_wanted WHERE stock_wanted.article = products.article)
+    WHERE article IN (SELECT article FROM stock_wanted) AND stock IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM stock_wanted AS item
+                      JOIN products AS p ON p.article = item.article
+                      WHERE p.stock < item.quantity)'''
+
+# Ведется ли остаток хоть у одного товара
+ANY_STOCKED = 'SELECT EXISTS (SELECT 1 FROM products WHERE stock IS NOT NULL)'
+
+# Товары заказа, которых не хватает: (артикул, остаток)
+SHORTAGES = '''SELECT p.article, p.stock FROM stock_wanted AS item
+    JOIN products AS p ON p.article = item.article
+    WHERE p.stock < item.quantity'''
+
+
+# Заказ нельзя оформить: товаров на складе меньше, чем в корзине
+class OutOfStockError(ValueError):
+    def __init__(self, shortages):
+        # shortages: {артикул: сколько осталось}
+        details = ', '.join(f"артикул {article}: осталось {stock}" for article, stock in shortages.items())
+        super().__init__(f"Недостаточно товара на складе ({details})")
+        self.shortages = shortages
+
+
+def validate_stock(value):
+    # Остаток - целое неотрицательное число или None (не ведется)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError("Остаток должен быть целым числом")
+    if value < 0:
+        raise ValueError("Остаток не может быть отрицательным")
+    return value
+
+
+def reserve_stock(cursor, lines):
+    # Списываем остатки по строкам заказа (артикул, название, автор, цена, жанр, количество)
+    # внутри транзакции вызывающего кода. OutOfStockError - транзакцию нужно откатить.
+    # Пока остатки не ведутся ни для одного товара, заказ не стоит ничего лишнего:
+    # проверка - одно чтение частичного индекса idx_products_stocked
+    if not cursor.execute(ANY_STOCKED).fetchone()[0]:
+        return 0
+    # Один артикул в нескольких строках списывается суммой
+    wanted = {}
+    for line in lines:
+        if line[0] is not None:
+            wanted[line[0]] = wanted.get(line[0], 0) + line[5]
+    cursor.execute(WANTED_TABLE)
+    try:
+        cursor.executemany('INSERT INTO stock_wanted (article, quantity) VALUES (?, ?)', wanted.items())
+        cursor.execute(RESERVE)
+        if cursor.rowcount > 0:
+            return cursor.rowcount
+        # Ничего не списано: либо в заказе нет товаров с остатком, либо какого-то не хватает
+        shortages = dict(cursor.execute(SHORTAGES).fetchall())
+    finally:
+        cursor.execute('DELETE FROM stock_wanted')
+    if shortages:
+        raise OutOfStockError(shortages)
+    return 0
+
+
+# Кэш остатков в памяти. У каждого потока свой кэш при своем соединении:
+# PRAGMA data_version соединения меняется, когда базу изменило любое другое соединение
+# (другой поток или другая касса), и тогда кэш потока сбрасывается целиком.
+# Свои изменения соединение не видит в data_version, поэтому после них
+# вызывающий код сбрасывает кэш своего потока через invalidate.
+# Пока ни у одного товара не ведется остаток, get отвечает без запросов к таблице
+class StockCache:
+    def __init__(self, connections):
+        self.connections = connections
+        self._local = threading.local()
+
+    def _levels(self):
+        conn = self.connections.get()
+        version = conn.execute('PRAGMA data_version').fetchone()[0]
+        local = self._local
+        if getattr(local, 'version', None) != version:
+            local.version = version
+            local.levels = {}
+            local.any_stocked = conn.execute(ANY_STOCKED).fetchone()[0]
+        return conn, local.levels
+
+    def get(self, article):
+        # Остаток товара или None, если остаток не ведется (или товара нет)
+        conn, levels = self._levels()
+        if not self._local.any_stocked:
+            return None
+        try:
+            return levels[article]
+        except KeyError:
+            row = conn.execute('SELECT stock FROM products WHERE article = ?', (article,)).fetchone()
+            stock = levels[article] = row[0] if row else None
+            return stock
+
+    def invalidate(self):
+        self._local.version = None
@@ -0,0 +1,29 @@
+# tests/conftest.py
+# Общие фикстуры тестов
+import pytest
+
+from library import Store
+
+
+# Магазин на чистой базе во временном каталоге; соединение закрывается после теста
+@pytest.fixture
+def store(tmp_path):
+    store = Store(str(tmp_path / 'store.db'))
+    yield store
+    store.connections.close()
+
+
+# Фабрика магазинов на одной и той же базе - для тестов с перезапуском.
+# Все открытые магазины закрываются после теста
+@pytest.fixture
+def open_store(tmp_path):
+    stores = []
+
+    def open_store():
+        store = Store(str(tmp_path / 'store.db'))
+        stores.append(store)
+        return store
+
+    yield open_store
+    for store in stores:
+        store.connections.close()
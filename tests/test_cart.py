@@ -0,0 +1,18 @@
+# tests/test_cart.py
+# Корзина: количества и сумма
+import pytest
+
+from book import Book
+from cart import Cart
+
+
+def test_remove_rejects_non_positive_quantity():
+    cart = Cart()
+    cart.add(Book('Война и мир', 'Лев Толстой', 500, 'Роман', 10), 'books', 2)
+    for quantity in (0, -3):
+        with pytest.raises(ValueError):
+            cart.remove(10, quantity)
+    assert cart.get(10).quantity == 2
+    assert cart.total == 1000
+    assert cart.remove(10, 1) and cart.total == 500
+    assert cart.remove(10) and cart.total == 0 and not cart
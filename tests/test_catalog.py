@@ -0,0 +1,65 @@
+# tests/test_catalog.py
+# Версии индекса каталога: чтение не публикует версии, изменения доходят до корзин
+import sqlite3
+
+
+def test_reads_do_not_publish_versions(store):
+    version = store.index.snapshot()
+    for _ in range(100):
+        store.list_products('books', limit=5)
+        store.get_by_article(11)
+    store.list_products()
+    store.search('война')
+    assert store.index.snapshot() is version
+
+
+def test_reprice_reaches_carts_and_keeps_old_objects(store):
+    store.add_to_cart(10, quantity=2)
+    page = store.list_products('books', limit=2)
+    store.reprice(percent=10, category='books')
+    # Уже отданные объекты не меняются, новые чтения видят новые цены
+    assert [product.price for product in page] == [500, 400]
+    assert [product.price for product in store.list_products('books', limit=2)] == [550, 440]
+    line = store.cart.get(10)
+    assert line.product.price == line.unit_price == 550
+    assert store.cart.total == 1100
+
+
+def test_update_product_is_published(store):
+    store.add_to_cart(11)
+    store.update_product(11, title='Мастер', price=410)
+    product = store.get_by_article(11)
+    assert (product.title, product.price) == ('Мастер', 410)
+    assert store.cart.get(11).product is product
+    assert store.cart.total == 410
+
+
+def test_page_matches_rows_changed_behind_the_index(store):
+    # Корзина держит опубликованный объект, иначе слабая ссылка умрет и индекс будет пуст
+    store.add_to_cart(12)
+    store.update_product(12, price=360)
+    published = store.index.get(12)
+    assert published is store.cart.get(12).product and published.price == 360
+    store.conn.execute('UPDATE products SET price = 1 WHERE article = 12')
+    store.conn.commit()
+    # Объект индекса жив, но строка другая - страница строится по строке
+    assert store.index.get(12) is published
+    product = store.list_products('books', after=11, limit=1)[0]
+    assert product is not published and product.price == 1
+
+
+def test_lookup_sees_change_from_another_connection(store):
+    # Объект товара 13 держит корзина другой кассы
+    session_id = store.open_session()
+    store.add_to_cart(13, session_id=session_id)
+    store.update_product(13, price=460)
+    assert store.index.get(13).price == 460
+    # Цену меняет другой терминал (отдельное соединение, мимо индекса этого процесса)
+    other = sqlite3.connect(store.db_path)
+    with other:
+        other.execute('UPDATE products SET price = 1 WHERE article = 13')
+    other.close()
+    assert store.get_by_article(13).price == 1
+    assert [product.price for product in store.search('Анна Каренина')] == [1]
+    store.add_to_cart(13)
+    assert store.cart.total == 1
@@ -0,0 +1,50 @@
+# tests/test_catalog_columns.py
+# Колоночный каталог (catalog.Catalog) и строки-представления ProductView
+import pytest
+
+from book import Book, Newspaper
+from catalog import Catalog
+
+ROWS = [
+    (10, 'books', 'Война и мир', 'Лев Толстой', 500, 'Роман', None),
+    (13, 'books', 'Анна Каренина', 'Лев Толстой', 450.5, 'Роман', None),
+    (81, 'newspapers', 'Ведомости', 'Business News Media', 50, 'Газета', '2024-03-20'),
+]
+
+
+def test_views_behave_like_products():
+    catalog = Catalog.from_rows(ROWS)
+    assert len(catalog) == 3 and 13 in catalog and 12 not in catalog
+    book = catalog.get(10)
+    assert (book.article, book.category, book.title, book.author, book.genre) == (
+        10, 'books', 'Война и мир', 'Лев Толстой', 'Роман')
+    # Целые цены остаются целыми, дробные - дробными
+    assert book.price == 500 and isinstance(book.price, int)
+    assert catalog.get(13).price == 450.5
+    assert str(book) == str(Book('Война и мир', 'Лев Толстой', 500, 'Роман', 10))
+    newspaper = catalog.get(81)
+    assert newspaper.publisher == 'Business News Media'
+    assert str(newspaper) == str(Newspaper('Ведомости', 'Business News Media', 50, '2024-03-20', 81))
+    assert [view.article for view in catalog] == [10, 13, 81]
+    assert catalog.get(10) == catalog[0] and catalog.get(12) is None
+
+
+def test_price_setter_validates_and_writes_the_column():
+    catalog = Catalog.from_rows(ROWS)
+    catalog.get(10).price = 550
+    assert catalog.prices[0] == 550
+    for value in (-1, float('inf'), True, '10'):
+        with pytest.raises(ValueError):
+            catalog.get(10).price = value
+    assert catalog.get(10).price == 550
+
+
+def test_append_replaces_and_handles_unsorted_articles():
+    catalog = Catalog.from_rows(ROWS)
+    catalog.append(10, 'books', 'Война и мир', 'Лев Толстой', 600, 'Роман')
+    assert len(catalog) == 3 and catalog.get(10).price == 600
+    # Артикул меньше последнего - поиск переключается на словарь
+    catalog.append(5, 'magazines', 'Time', 'Time Inc.', 100, 'Политика')
+    assert catalog.get(5).category == 'magazines' and catalog.get(81).title == 'Ведомости'
+    # Повторяющиеся строки хранятся в одном экземпляре
+    assert catalog.authors[0] is catalog.authors[1]
@@ -0,0 +1,46 @@
+# tests/test_decorators.py
+# Контракты: выборочная проверка и ее настройки
+import os
+import subprocess
+import sys
+
+import pytest
+
+from decorators import PreConditionError, check_conditions, contract_settings, set_contract_mode
+
+
+def positive(value):
+    return value > 0
+
+
+def test_sampled_checks_first_and_every_nth_call():
+    @check_conditions(pre_conditions=[positive], mode='sampled', sample_every=2)
+    def identity(value):
+        return value
+
+    with pytest.raises(PreConditionError):
+        identity(-1)
+    assert identity(-1) == -1
+    with pytest.raises(PreConditionError):
+        identity(-1)
+
+
+@pytest.mark.parametrize('sample_every', [0, -1, 1.5, '10', True])
+def test_invalid_sample_every_is_rejected(sample_every):
+    settings = dict(contract_settings)
+    with pytest.raises(ValueError):
+        set_contract_mode('sampled', sample_every)
+    assert contract_settings == settings
+    with pytest.raises(ValueError):
+        check_conditions(pre_conditions=[positive], mode='sampled', sample_every=sample_every)
+
+
+@pytest.mark.parametrize('value', ['0', 'abc'])
+def test_invalid_sample_env_gives_clear_error(value):
+    env = dict(os.environ, STORE_CONTRACTS_SAMPLE=value)
+    result = subprocess.run([sys.executable, '-c', 'import decorators'], env=env,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            capture_output=True, text=True)
+    assert result.returncode != 0
+    assert 'STORE_CONTRACTS_SAMPLE' in result.stderr
+    assert 'ZeroDivisionError' not in result.stderr
@@ -0,0 +1,64 @@
+# tests/test_importer.py
+# Импорт каталога: проверка строк и пропуск некорректных
+import pytest
+
+from importer import ImportRowError, import_products
+
+HEADER = 'article,category,title,author,price,genre,date_published\n'
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_malformed_jsonl_line_is_a_row_error(store, tmp_path):
+    path = write(tmp_path, 'feed.jsonl',
+                 '{"article": 500, "category": "books", "title": "A", "price": 10}\n'
+                 '{"article": 501, "category": \n'
+                 '[1, 2]\n'
+                 '{"article": 502, "category": "books", "title": "B", "price": 20}\n')
+    with pytest.raises(ImportRowError) as error:
+        import_products(store, path)
+    assert error.value.line_number == 2
+    report = import_products(store, path, skip_invalid=True)
+    assert (report.rows, report.skipped) == (2, 2)
+    assert store.get_by_article(502).title == 'B'
+
+
+@pytest.mark.parametrize('article', ['501.9', 'x', ''])
+def test_article_must_be_integer(store, tmp_path, article):
+    path = write(tmp_path, 'feed.csv', HEADER + f'{article},books,A,B,10,Роман,\n')
+    with pytest.raises(ImportRowError):
+        import_products(store, path)
+    assert store.get_by_article(501) is None
+
+
+def test_integral_article_values_are_accepted(store, tmp_path):
+    path = write(tmp_path, 'feed.jsonl', '{"article": 503.0, "category": "books", "title": "C", "price": 5}\n')
+    assert import_products(store, path).rows == 1
+    assert store.get_by_article(503).title == 'C'
+
+
+@pytest.mark.parametrize('price', ['inf', '-inf', 'nan'])
+def test_non_finite_csv_price_is_a_row_error(store, tmp_path, price):
+    path = write(tmp_path, 'feed.csv', HEADER + f'600,books,A,B,{price},Роман,\n')
+    with pytest.raises(ImportRowError):
+        import_products(store, path)
+    assert store.get_by_article(600) is None
+
+
+def test_invalid_jsonl_prices_are_skipped_next_to_valid_rows(store, tmp_path):
+    # NaN и Infinity - расширение json-модуля Python, true - не цена
+    path = write(tmp_path, 'feed.jsonl',
+                 '{"article": 701, "category": "books", "title": "A", "price": NaN}\n'
+                 '{"article": 702, "category": "books", "title": "B", "price": Infinity}\n'
+                 '{"article": 703, "category": "books", "title": "C", "price": true}\n'
+                 '{"article": 705, "category": "books", "title": "D", "price": 15}\n')
+    with pytest.raises(ImportRowError):
+        import_products(store, path)
+    report = import_products(store, path, skip_invalid=True)
+    assert (report.rows, report.skipped) == (1, 3)
+    assert [store.get_by_article(article) for article in (701, 702, 703)] == [None, None, None]
+    assert store.get_by_article(705).price == 15
@@ -0,0 +1,112 @@
+# tests/test_journal.py
+# Журнал корзин: корзины переживают перезапуск, в том числе забранные для фоновой записи заказа
+import sqlite3
+
+import pytest
+
+from library import cart_order_lines
+from persistence import OrderWriter
+
+
+def restart(store, open_store):
+    # "Падение": старый Store просто бросаем, новый читает ту же базу
+    store.connections.close()
+    return open_store()
+
+
+def cart_state(store, session_id='default'):
+    return {line.product.article: line.quantity for line in store.view_cart(session_id)}
+
+
+def count_orders(store):
+    return store.conn.execute('SELECT COUNT(*) FROM orders').fetchone()[0]
+
+
+def test_open_cart_survives_restart(open_store):
+    store = open_store()
+    store.add_to_cart(10, quantity=2)
+    store.add_to_cart(11)
+    store.set_cart_quantity(11, 3)
+    store.remove_from_cart(10, 1)
+    store = restart(store, open_store)
+    assert cart_state(store) == {10: 1, 11: 3}
+
+
+def test_taken_cart_survives_crash_before_order_is_written(open_store):
+    store = open_store()
+    store.add_to_cart(10, quantity=2)
+    lines, journal_key = store.take_cart()
+    assert lines and journal_key is not None
+    assert cart_state(store) == {}
+    store = restart(store, open_store)
+    assert cart_state(store) == {10: 2}
+    assert count_orders(store) == 0
+
+
+def test_changes_after_take_are_kept_separately(open_store):
+    store = open_store()
+    store.add_to_cart(10, quantity=2)
+    store.take_cart()
+    store.add_to_cart(10)
+    store.add_to_cart(11)
+    store.set_cart_quantity(10, 4)
+    store = restart(store, open_store)
+    # Забранная корзина (2 шт.) возвращается к новой (4 шт.), а не перезаписывается ею
+    assert cart_state(store) == {10: 6, 11: 1}
+    # После восстановления журнал сжат до снимка корзины сессии
+    store = restart(store, open_store)
+    assert cart_state(store) == {10: 6, 11: 1}
+
+
+def test_written_order_clears_taken_cart(open_store):
+    store = open_store()
+    store.add_to_cart(10, quantity=2)
+    lines, journal_key = store.take_cart()
+    store.add_to_cart(11)
+    writer = OrderWriter(store.db_path, store.journal, batch_window=0)
+    writer.submit(cart_order_lines(lines), journal_key=journal_key)
+    writer.close()
+    store = restart(store, open_store)
+    assert count_orders(store) == 1
+    assert cart_state(store) == {11: 1}
+
+
+def test_restored_cart_is_not_duplicated(open_store):
+    store = open_store()
+    store.add_to_cart(10, quantity=2)
+    lines, journal_key = store.take_cart()
+    # Заказ записать не удалось - строки возвращаются в корзину
+    store.restore_cart(lines, journal_key=journal_key)
+    assert cart_state(store) == {10: 2}
+    store = restart(store, open_store)
+    assert cart_state(store) == {10: 2}
+
+
+def test_closed_session_is_not_restored(open_store):
+    store = open_store()
+    session_id = store.open_session()
+    store.add_to_cart(10, session_id=session_id)
+    store.close_session(session_id)
+    store = restart(store, open_store)
+    assert session_id not in store.sessions
+
+
+def test_failed_journal_write_leaves_cart_unchanged(open_store, monkeypatch):
+    store = open_store()
+    store.add_to_cart(10, quantity=2)
+    store.add_to_cart(11)
+
+    def locked(*args):
+        raise sqlite3.OperationalError('database is locked')
+
+    monkeypatch.setattr(store.journal, 'append', locked)
+    for change in (lambda: store.add_to_cart(10), lambda: store.add_to_cart(12),
+                   lambda: store.remove_from_cart(10, 1), lambda: store.remove_from_cart(11),
+                   lambda: store.set_cart_quantity(10, 5)):
+        with pytest.raises(sqlite3.OperationalError):
+            change()
+        assert cart_state(store) == {10: 2, 11: 1}
+    assert store.view_cart().total == 2 * 500 + 400
+    monkeypatch.undo()
+    store = restart(store, open_store)
+    assert cart_state(store) == {10: 2, 11: 1}
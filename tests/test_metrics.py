@@ -0,0 +1,57 @@
+# tests/test_metrics.py
+# Гистограммы задержек: границы перцентилей и выгрузка
+import json
+import math
+import random
+
+from metrics import SUB_BUCKETS, LatencyHistogram, MetricsRegistry, _bucket_index, _bucket_upper
+
+
+def exact_percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(len(ordered) * percent / 100)) - 1]
+
+
+def test_bucket_upper_bounds_its_values():
+    for value in list(range(2000)) + [random.Random(1).randrange(1, 10 ** 12) for _ in range(2000)]:
+        upper = _bucket_upper(_bucket_index(value))
+        assert value <= upper <= value + value // SUB_BUCKETS
+    # Корзины упорядочены так же, как значения
+    assert all(_bucket_index(value) <= _bucket_index(value + 1) for value in range(10000))
+
+
+def test_percentiles_are_within_bucket_error():
+    rng = random.Random(2)
+    values = [int(rng.lognormvariate(13, 1.5)) for _ in range(10000)]
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    for percent in (1, 50, 90, 95, 99, 100):
+        exact = exact_percentile(values, percent)
+        estimate = histogram.percentile(percent)
+        # Перцентиль не меньше точного значения и больше его не более чем на 1/8
+        assert exact <= estimate <= exact * (1 + 1 / SUB_BUCKETS)
+    assert histogram.percentile(100) == max(values)
+
+
+def test_percentile_never_exceeds_max_and_empty_is_zero():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(99) == 0
+    histogram.record(1000)
+    assert histogram.percentile(50) == histogram.percentile(99) == 1000
+
+
+def test_summary_and_exports():
+    registry = MetricsRegistry(echo=False)
+    for duration in (1_000_000, 2_000_000, 3_000_000):
+        registry.record('Оформление "заказа"', duration)
+    registry.record('Оформление "заказа"', 4_000_000, error=True)
+    summary = json.loads(registry.to_json())['Оформление "заказа"']
+    assert (summary['count'], summary['errors']) == (4, 1)
+    assert summary['min_ms'] == 1.0 and summary['max_ms'] == 4.0 and summary['mean_ms'] == 2.5
+    assert 2.0 <= summary['p50_ms'] <= 2.25
+    text = registry.to_prometheus()
+    assert 'store_scenario_duration_seconds_count{scenario="Оформление \\"заказа\\""} 4' in text
+    assert 'store_scenario_errors_total{scenario="Оформление \\"заказа\\""} 1' in text
+    registry.reset()
+    assert registry.snapshot()['Оформление "заказа"']['count'] == 0
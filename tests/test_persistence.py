@@ -0,0 +1,39 @@
+# tests/test_persistence.py
+# Фоновая запись заказов: пачка одной транзакцией, при ошибке - по одному
+from library import order_line
+from persistence import OrderWriter
+from stock import OutOfStockError
+
+
+def count_orders(store):
+    return store.conn.execute('SELECT COUNT(*) FROM orders').fetchone()[0]
+
+
+def test_jobs_are_written_in_one_batch(store):
+    writer = OrderWriter(store.db_path, batch_window=0.5)
+    batches = []
+    write = writer._write
+    writer._write = lambda conn, batch: (batches.append(len(batch)), write(conn, batch))
+    done = []
+    product = store.get_by_article(10)
+    for _ in range(3):
+        writer.submit([order_line(product)], on_done=done.append)
+    writer.close()
+    assert batches == [3]
+    assert len(set(done)) == 3
+    assert count_orders(store) == 3
+
+
+def test_failed_job_does_not_cancel_the_batch(store):
+    store.set_stock(11, 1)
+    writer = OrderWriter(store.db_path, batch_window=0.5)
+    done = []
+    errors = []
+    writer.submit([order_line(store.get_by_article(10))], on_done=done.append)
+    writer.submit([order_line(store.get_by_article(11), quantity=5)], on_error=errors.append)
+    writer.submit([order_line(store.get_by_article(12))], on_done=done.append)
+    writer.close()
+    assert len(done) == 2
+    assert len(errors) == 1 and isinstance(errors[0], OutOfStockError)
+    assert count_orders(store) == 2
+    assert store.available(11) == 1
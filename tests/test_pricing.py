@@ -0,0 +1,30 @@
+# tests/test_pricing.py
+# Пакетная проверка новых цен при массовой переоценке
+import math
+
+import pytest
+
+from pricing import RepricingError, new_prices
+
+
+def test_new_prices_are_rounded():
+    assert new_prices([1, 2], [100, 99.99], percent=10) == [110, 109.99]
+
+
+@pytest.mark.parametrize('change', [{'amount': math.inf}, {'amount': -math.inf}, {'amount': math.nan},
+                                    {'percent': math.inf}, {'percent': math.nan}, {'amount': '5'}])
+def test_invalid_change_is_rejected(change):
+    with pytest.raises(RepricingError):
+        new_prices([1], [100], **change)
+
+
+def test_invalid_results_reject_whole_batch():
+    with pytest.raises(RepricingError) as error:
+        new_prices([1, 2, 3], [100, 5, 1e308], percent=200, amount=-20)
+    assert error.value.rejected == 2 and error.value.article == 2
+
+
+def test_store_does_not_commit_infinite_price(store):
+    with pytest.raises(RepricingError):
+        store.reprice(amount=float('inf'), articles=(11, 11))
+    assert store.conn.execute('SELECT price FROM products WHERE article = 11').fetchone()[0] == 400
@@ -0,0 +1,30 @@
+# tests/test_profiling.py
+# Разбор STORE_PROFILE_ACTIONS
+import os
+import subprocess
+import sys
+
+import pytest
+
+from profiling import parse_requests
+
+
+def test_requests_are_parsed():
+    assert parse_requests('save_order:5:out.pstats, clear_cart') == [
+        ('save_order', 5, 'out.pstats'), ('clear_cart', 10, None)]
+    assert parse_requests('') == []
+
+
+@pytest.mark.parametrize('value', ['clear_cart:abc', 'clear_cart:0', 'clear_cart:-2', ':5', 'clear_cart:1.5'])
+def test_malformed_request_names_the_variable(value):
+    with pytest.raises(ValueError, match='STORE_PROFILE_ACTIONS'):
+        parse_requests(value)
+
+
+def test_malformed_env_gives_clear_error_on_import():
+    env = dict(os.environ, STORE_PROFILE_ACTIONS='clear_cart:abc')
+    result = subprocess.run([sys.executable, '-c', 'import decorators'], env=env,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            capture_output=True, text=True)
+    assert result.returncode != 0
+    assert 'STORE_PROFILE_ACTIONS' in result.stderr
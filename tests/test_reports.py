@@ -0,0 +1,48 @@
+# tests/test_reports.py
+# Сводки продаж: пошаговое обновление при записи заказов и однократное заполнение по истории
+import reports
+from database import run_transaction
+from library import insert_order
+
+# (артикул, название, автор, цена, жанр, количество); пустые и неизвестные авторы и жанры
+# должны попасть в одну строку сводки
+ORDERS = [
+    ('2024-03-01 10:00:00', [(10, 'A', 'Толстой', 500, 'Роман', 2), (11, 'B', '', 100, None, 1)]),
+    ('2024-03-01 18:30:00', [(12, 'C', None, 50, '', 3), (10, 'A', 'Толстой', 500, 'Роман', 1)]),
+    ('2024-03-02 09:15:00', [(13, 'D', 'Булгаков', 400, 'Роман', 1), (14, 'E', '', 20, '', 5)]),
+]
+
+
+def record_orders(store):
+    for created_at, lines in ORDERS:
+        run_transaction(store.conn, lambda cursor: insert_order(cursor, lines, created_at))
+
+
+def summaries(conn):
+    return (reports.revenue_by_genre(conn), reports.top_authors(conn, limit=100),
+            reports.daily_totals(conn), reports.period_totals(conn))
+
+
+def test_incremental_totals(store):
+    record_orders(store)
+    genres = {row['genre']: (row['revenue'], row['items'], row['orders']) for row in reports.revenue_by_genre(store.conn)}
+    assert genres == {'Роман': (1900, 4, 3), reports.UNKNOWN: (350, 9, 3)}
+    assert reports.author_sales(store.conn, reports.UNKNOWN)['orders'] == 3
+    assert [(row['day'], row['revenue'], row['orders']) for row in reports.daily_totals(store.conn)] == [
+        ('2024-03-01', 1750, 2), ('2024-03-02', 500, 1)]
+    assert reports.daily_totals(store.conn, '2024-03-02', '2024-03-02')[0]['items'] == 6
+    assert reports.period_totals(store.conn, '2024-03-01', '2024-03-01') == {'revenue': 1750, 'items': 7, 'orders': 2}
+    assert reports.period_totals(store.conn, '2025-01-01') == {'revenue': 0, 'items': 0, 'orders': 0}
+
+
+def test_backfill_matches_incremental_totals(store):
+    record_orders(store)
+    recorded = summaries(store.conn)
+    # Сводки, как до их появления: история заказов есть, сводок нет
+    with store.conn:
+        for table in reports.SUMMARY_TABLES:
+            store.conn.execute(f'DELETE FROM {table}')
+    assert reports.backfill(store.conn)
+    assert summaries(store.conn) == recorded
+    # Повторно сводки не заполняются
+    assert not reports.backfill(store.conn)
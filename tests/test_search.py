@@ -0,0 +1,64 @@
+# tests/test_search.py
+# Поиск по началу слов: регистр, кириллица и "ё" не важны, все слова запроса обязательны
+from search import SearchIndex, tokenize
+
+
+def build(rows):
+    index = SearchIndex()
+    index.build(rows)
+    return index
+
+
+ROWS = [
+    (10, 'Война и мир', 'Лев Толстой'),
+    (11, 'Мастер и Маргарита', 'Михаил Булгаков'),
+    (13, 'Анна Каренина', 'Лев Толстой'),
+    (20, 'Ёлка', 'Пётр Ёжиков'),
+    (30, 'The Master Plan', 'John Smith'),
+]
+
+
+def test_tokenize_normalizes_case_and_yo():
+    assert tokenize('Пётр ЁЖИКОВ, Straße') == ['петр', 'ежиков', 'strasse']
+
+
+def test_prefix_matching_is_case_insensitive():
+    index = build(ROWS)
+    assert index.search('ВОЙ') == [10]
+    assert index.search('тол') == [10, 13]
+    # Кириллица и латиница - разные буквы
+    assert index.search('мас') == [11]
+    assert index.search('MAS') == [30]
+    assert index.search('war') == []
+
+
+def test_yo_matches_ye_both_ways():
+    index = build(ROWS)
+    assert index.search('елка') == [20]
+    assert index.search('Ёжик') == [20]
+    assert index.search('петр') == [20]
+
+
+def test_all_query_words_must_match():
+    index = build(ROWS)
+    assert index.search('лев анна') == [13]
+    assert index.search('лев мастер') == []
+    # Слово запроса может совпадать и с названием, и с автором
+    assert index.search('мар булг') == [11]
+
+
+def test_limit_and_updates():
+    index = build(ROWS)
+    assert len(index.search('т', limit=1)) == 1
+    index.add(13, 'Воскресение', 'Лев Толстой')
+    assert index.search('анна') == []
+    assert index.search('воскр') == [13]
+    assert index.remove(10)
+    assert index.search('война') == []
+    assert index.search('тол') == [13]
+
+
+def test_store_search_returns_products(store):
+    assert [product.article for product in store.search('Толст')] == [10, 13]
+    assert [product.title for product in store.search('мастер марг')] == ['Мастер и Маргарита']
+    assert store.search('') == []
@@ -0,0 +1,67 @@
+# tests/test_server.py
+# Обработчики HTTP API (server.StoreAPI) без сети: разбор параметров и коды ответов
+import json
+
+import pytest
+
+from server import StoreAPI
+
+
+@pytest.fixture
+def api(store):
+    return StoreAPI(store)
+
+
+def call(api, method, target, payload=None):
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    status, result = api.handle(method, target, body)
+    return status.value, result
+
+
+def test_page_limit_is_validated(api):
+    assert call(api, 'GET', '/products?limit=0')[0] == 400
+    assert call(api, 'GET', '/products?limit=-1')[0] == 400
+    status, result = call(api, 'GET', '/products?limit=2')
+    assert status == 200 and len(result['products']) == 2 and result['next_after'] is not None
+
+
+def test_quantities_must_be_positive_integers(api):
+    session_id = call(api, 'POST', '/sessions')[1]['session_id']
+    cart = f'/sessions/{session_id}/cart'
+    assert call(api, 'POST', cart, {'article': 10})[0] == 200
+    assert call(api, 'POST', cart, {'article': 10, 'quantity': 1.7})[0] == 400
+    assert call(api, 'POST', cart, {'article': 10, 'quantity': 0})[0] == 400
+    assert call(api, 'DELETE', f'{cart}/10?quantity=-5')[0] == 400
+    assert call(api, 'DELETE', f'{cart}/10?quantity=0')[0] == 400
+    assert call(api, 'PUT', f'{cart}/10', {'quantity': 2.5})[0] == 400
+    assert call(api, 'PUT', f'{cart}/10', {'quantity': 3.0})[1]['items_count'] == 3
+    assert call(api, 'GET', cart)[1]['items_count'] == 3
+
+
+def test_default_session_is_not_exposed(api):
+    api.store.add_to_cart(10)
+    for method, target in (('GET', '/sessions/default/cart'), ('POST', '/sessions/default/checkout'),
+                           ('DELETE', '/sessions/default')):
+        assert call(api, method, target)[0] == 404
+    assert call(api, 'POST', '/sessions/default/cart', {'article': 11})[0] == 404
+    assert api.store.cart.items_count == 1
+
+
+def test_oversized_integers_are_rejected(api):
+    session_id = call(api, 'POST', '/sessions')[1]['session_id']
+    cart = f'/sessions/{session_id}/cart'
+    huge = 99999999999999999999999
+    assert call(api, 'GET', f'/products/{huge}')[0] == 400
+    assert call(api, 'GET', f'/products?after={huge}')[0] == 400
+    assert call(api, 'GET', f'/products?after={2 ** 63}')[0] == 400
+    assert call(api, 'POST', cart, {'article': huge})[0] == 400
+    assert call(api, 'POST', cart, {'article': 10, 'quantity': 2 ** 63})[0] == 400
+    assert call(api, 'POST', cart, {'article': 10, 'quantity': 1e300})[0] == 400
+    assert call(api, 'POST', cart, {'article': 10, 'quantity': 10 ** 6})[0] == 400
+    assert call(api, 'GET', cart)[1]['items_count'] == 0
+    assert call(api, 'POST', cart, {'article': 10})[0] == 200
+    assert call(api, 'PUT', f'{cart}/10', {'quantity': 2 ** 63})[0] == 400
+    assert call(api, 'PUT', f'{cart}/{huge}', {'quantity': 1})[0] == 400
+    assert call(api, 'DELETE', f'{cart}/10?quantity={2 ** 63}')[0] == 400
+    # Корзина не пострадала: заказ оформляется
+    assert call(api, 'POST', f'/sessions/{session_id}/checkout')[0] == 201
@@ -0,0 +1,49 @@
+# tests/test_stock.py
+# Остатки: корзина не превышает склад, заказ списывает остатки целиком или не списывает ничего
+import pytest
+
+from stock import OutOfStockError
+
+
+def stock_of(store, article):
+    return store.conn.execute('SELECT stock FROM products WHERE article = ?', (article,)).fetchone()[0]
+
+
+def test_set_cart_quantity_respects_stock(store):
+    store.set_stock(10, 3)
+    assert store.add_to_cart(10)
+    assert not store.set_cart_quantity(10, 4)
+    assert store.view_cart().get(10).quantity == 1
+    assert store.set_cart_quantity(10, 3)
+    assert store.view_cart().get(10).quantity == 3
+    assert store.set_cart_quantity(10, 0)
+    assert not store.view_cart()
+
+
+def test_order_reserves_stock(store):
+    store.set_stock(10, 5)
+    store.set_stock(11, 2)
+    store.add_to_cart(10, quantity=3)
+    store.add_to_cart(11, quantity=2)
+    # Товар без остатка заказывается без ограничений
+    store.add_to_cart(12, quantity=7)
+    assert store.save_order() is not None
+    assert (stock_of(store, 10), stock_of(store, 11), stock_of(store, 12)) == (2, 0, None)
+
+
+def test_shortage_reserves_nothing(store):
+    store.set_stock(10, 5)
+    store.set_stock(11, 2)
+    store.add_to_cart(10, quantity=3)
+    store.add_to_cart(11, quantity=2)
+    # Пока товар лежал в корзине, его раскупили
+    store.set_stock(11, 1)
+    with pytest.raises(OutOfStockError) as error:
+        store.save_order()
+    assert error.value.shortages == {11: 1}
+    assert (stock_of(store, 10), stock_of(store, 11)) == (5, 1)
+    assert len(store.view_cart()) == 2
+    # Временная таблица заказа очищена - следующий заказ списывает только свои строки
+    store.set_cart_quantity(11, 1)
+    assert store.save_order() is not None
+    assert (stock_of(store, 10), stock_of(store, 11)) == (2, 0)
@@ -0,0 +1,66 @@
+# widgets.py
+# Виджеты интерфейса магазина
+from kivy.metrics import dp
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview import RecycleView
+
+# Сколько строк запрашивать у магазина за раз
+PAGE_SIZE = 50
+# Догружаем следующую страницу, когда до конца списка осталось меньше этой доли прокрутки
+PRELOAD_THRESHOLD = 0.2
+
+
+# Виртуализированный список строк на основе RecycleView.
+# Виджеты создаются только для видимых строк и переиспользуются при прокрутке,
+# а данные запрашиваются у магазина страницами по мере прокрутки вниз.
+# Поэтому показ категории на 100 тысяч товаров стоит столько же, сколько показ первой страницы
+class PagedListView(RecycleView):
+    def __init__(self, row_height=28, **kwargs):
+        super().__init__(**kwargs)
+        self.viewclass = 'Label'
+        layout = RecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, dp(row_height)),
+            default_size_hint=(1, None),
+            size_hint_y=None
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+        # Функция fetch_page(offset, limit) -> список строк текущего содержимого
+        self._fetch_page = None
+        self.page_size = PAGE_SIZE
+        self._exhausted = True
+        self.bind(scroll_y=self._on_scroll)
+
+    def show(self, fetch_page, page_size=PAGE_SIZE):
+        # Показываем новое содержимое: сбрасываем прокрутку и загружаем первую страницу
+        self._fetch_page = fetch_page
+        self.page_size = page_size
+        self._exhausted = False
+        self.data = []
+        self.scroll_y = 1
+        self.load_next_page()
+
+    def show_rows(self, rows):
+        # Небольшой готовый список строк (например, результаты поиска)
+        self.show(lambda offset, limit: rows[offset:offset + limit])
+
+    def clear(self):
+        self._fetch_page = None
+        self._exhausted = True
+        self.data = []
+
+    def load_next_page(self):
+        if self._exhausted or self._fetch_page is None:
+            return
+        rows = self._fetch_page(len(self.data), self.page_size)
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        if rows:
+            # Изменение data пересчитывает только раскладку, а не текстуры всех строк
+            self.data.extend([{'text': row} for row in rows])
+
+    def _on_scroll(self, instance, scroll_y):
+        # scroll_y = 0 - низ списка
+        if scroll_y <= PRELOAD_THRESHOLD:
+            self.load_next_page()